@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from typing import Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies.database import get_db
+from app.dependencies.database import get_read_db, get_write_db
 from app.services.phonebook_controller import PhonebookController
-from app.schemas.schemas import ContactCreate, ContactUpdate, ContactOut
+from app.schemas.schemas import (
+    ContactCreate,
+    ContactUpdate,
+    ContactOut,
+    ContactSuggestion,
+    BulkImportResult,
+    ContactBatchGet,
+    ContactBatchResult,
+    ContactStats,
+    IngestStatus
+)
 from app.core.logger import get_logger
 from app.core.config import settings
+from app.core.negotiation import negotiated_response
 
 logger = get_logger("phonebook_api", "INFO")
 
@@ -14,117 +28,285 @@ router = APIRouter()
 async def read_contacts(
     skip: int = 0,
     limit: int = settings.PAGINATION_DEFAULT_PAGE,
-    db: AsyncSession = Depends(get_db)
+    cursor: str | None = None,
+    sort: Literal["id", "name"] = "id",
+    fields: str | None = None,
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    logger.debug(f"[GET /contacts] skip={skip}, limit={limit}")
+    logger.debug("[GET /contacts] skip=%s, limit=%s, cursor=%s, sort=%s, fields=%s", skip, limit, cursor, sort, fields)
     try:
-        return await PhonebookController.list_contacts(db, skip, limit)
+        page = await PhonebookController.list_contacts(db, skip, limit, cursor, sort, fields)
+        stats = await PhonebookController.get_contact_stats()
+        headers = {"X-Total-Count": str(stats["total"])}
+        if page["next_cursor"]:
+            headers["X-Next-Cursor"] = page["next_cursor"]
+        return negotiated_response(page["body"], page["etag"], "/contacts", accept, accept_encoding, if_none_match, headers)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"[GET /contacts] Failed to read contacts: {e}")
+        logger.exception("[GET /contacts] Failed to read contacts: %s", e)
         raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contacts")
 
-@router.post("/contacts", tags=["Contact"], response_model=ContactOut, status_code=201)
+@router.post(
+    "/contacts",
+    tags=["Contact"],
+    response_model=ContactOut,
+    status_code=201,
+    responses={202: {"model": IngestStatus, "description": "Queued for write-behind ingestion (mode=async)"}}
+)
 async def create_contact(
+    request: Request,
     contact: ContactCreate,
-    db: AsyncSession = Depends(get_db)
+    mode: Literal["sync", "async"] = "sync",
+    db: AsyncSession = Depends(get_write_db)
 ):
-    logger.debug(f"[POST /contacts] Creating contact: {contact}")
+    logger.debug("[POST /contacts] Creating contact: %s, mode=%s", contact, mode)
     try:
+        if mode == "async":
+            status = await PhonebookController.enqueue_contact(contact)
+            location = request.url_for("read_ingest_status", tracking_id=status.tracking_id)
+            return JSONResponse(status.model_dump(), status_code=202, headers={"Location": str(location)})
         return await PhonebookController.create_contact(db, contact)
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"[POST /contacts] Failed to create contact: {e}")
+        logger.exception("[POST /contacts] Failed to create contact: %s", e)
         raise HTTPException(status_code=500, detail="Internal Server Error: Could not create contact")
 
+async def _iter_rows(payload: list):
+    for row in payload:
+        yield row
+
+@router.post("/contacts/bulk", tags=["Contact"], response_model=BulkImportResult)
+async def bulk_create_contacts(
+    request: Request,
+    on_conflict: Literal["skip", "update"] = "skip",
+    batch_size: int | None = None,
+    db: AsyncSession = Depends(get_write_db)
+):
+    content_type = request.headers.get("content-type", "")
+    logger.debug("[POST /contacts/bulk] content_type='%s', on_conflict=%s, batch_size=%s", content_type, on_conflict, batch_size)
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            rows = PhonebookController.iter_ndjson(request.stream())
+        else:
+            try:
+                payload = await request.json()
+            except ValueError:
+                payload = None
+            if not isinstance(payload, list):
+                raise HTTPException(status_code=400, detail="Request body must be a JSON array of contacts")
+            rows = _iter_rows(payload)
+        return await PhonebookController.bulk_create_contacts(db, rows, on_conflict, batch_size)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[POST /contacts/bulk] Failed to import contacts: %s", e)
+        raise HTTPException(status_code=500, detail="Internal Server Error: Could not import contacts")
+
+@router.post("/contacts/batch-get", tags=["Contact"], response_model=ContactBatchResult)
+async def batch_get_contacts(
+    payload: ContactBatchGet,
+    db: AsyncSession = Depends(get_read_db)
+):
+    logger.debug("[POST /contacts/batch-get] Fetching %s contacts", len(payload.ids))
+    try:
+        return await PhonebookController.get_contacts_batch(db, payload.ids)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[POST /contacts/batch-get] Failed to fetch contacts: %s", e)
+        raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contacts")
+
 @router.get("/contacts/search", tags=["Contact"], response_model=list[ContactOut])
 async def search_contacts(
     query: str,
     skip: int = 0,
     limit: int = settings.PAGINATION_DEFAULT_PAGE,
-    db: AsyncSession = Depends(get_db)
+    fields: str | None = None,
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    logger.debug(f"[GET /contacts/search] query='{query}', skip={skip}, limit={limit}")
+    logger.debug("[GET /contacts/search] query='%s', skip=%s, limit=%s, fields=%s", query, skip, limit, fields)
     try:
-        results = await PhonebookController.search_contacts(db, query, skip, limit)
-        if not results:
+        page = await PhonebookController.search_contacts(db, query, skip, limit, fields)
+        if page["body"] == "[]":
             msg = f"No contacts found matching query: '{query}'"
-            logger.info(f"[GET /contacts/search] {msg}")
+            logger.info("[GET /contacts/search] %s", msg)
             raise HTTPException(status_code=404, detail=msg)
-        return results
+        return negotiated_response(page["body"], page["etag"], "/contacts/search", accept, accept_encoding, if_none_match)
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"[GET /contacts/search] Failed to search contacts: {e}")
+        logger.exception("[GET /contacts/search] Failed to search contacts: %s", e)
         raise HTTPException(status_code=500, detail="Internal Server Error: Could not search contacts")
 
+@router.get("/contacts/export", tags=["Contact"], response_class=StreamingResponse)
+async def export_contacts(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format")
+):
+    logger.debug("[GET /contacts/export] format=%s", export_format)
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        PhonebookController.export_contacts(export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{export_format}"'}
+    )
+
+@router.get("/contacts/stats", tags=["Contact"], response_model=ContactStats)
+async def contact_stats():
+    logger.debug("[GET /contacts/stats] Fetching contact stats")
+    try:
+        return await PhonebookController.get_contact_stats()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[GET /contacts/stats] Failed to fetch contact stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contact stats")
+
+@router.get("/contacts/changes", tags=["Contact"], response_class=StreamingResponse)
+async def stream_contact_changes(
+    since: int | None = None,
+    last_event_id: str | None = Header(None)
+):
+    logger.debug("[GET /contacts/changes] since=%s, last_event_id=%s", since, last_event_id)
+    if last_event_id is not None:
+        # EventSource reconnects with Last-Event-ID, which is newer than the since= it was opened with.
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid Last-Event-ID: {last_event_id}")
+    return StreamingResponse(
+        PhonebookController.stream_changes(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/contacts/autocomplete", tags=["Contact"], response_model=list[ContactSuggestion])
+async def autocomplete_contacts(
+    prefix: str,
+    limit: int = settings.PAGINATION_DEFAULT_PAGE
+):
+    logger.debug("[GET /contacts/autocomplete] prefix='%s', limit=%s", prefix, limit)
+    try:
+        return await PhonebookController.autocomplete(prefix, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[GET /contacts/autocomplete] Failed to autocomplete contacts: %s", e)
+        raise HTTPException(status_code=500, detail="Internal Server Error: Could not autocomplete contacts")
+
+@router.get("/contacts/ingest/{tracking_id}", tags=["Contact"], response_model=IngestStatus)
+async def read_ingest_status(tracking_id: str):
+    logger.debug("[GET /contacts/ingest/%s] Fetching ingestion status", tracking_id)
+    try:
+        status = await PhonebookController.get_ingest_status(tracking_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail=f"Unknown or expired tracking id {tracking_id}")
+        return status
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[GET /contacts/ingest/%s] Failed to fetch ingestion status: %s", tracking_id, e)
+        raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch ingestion status")
+
+@router.get("/contacts/by-phone/{number}", tags=["Contact"], response_model=ContactOut)
+async def read_contact_by_phone(
+    number: str,
+    db: AsyncSession = Depends(get_read_db)
+):
+    logger.debug("[GET /contacts/by-phone/%s] Reverse lookup", number)
+    try:
+        contact = await PhonebookController.get_contact_by_phone(db, number)
+        if contact is None:
+            msg = f"No contact with phone number {number}"
+            logger.warning("[GET /contacts/by-phone/%s] %s", number, msg)
+            raise HTTPException(status_code=404, detail=msg)
+        return contact
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[GET /contacts/by-phone/%s] Failed reverse lookup: %s", number, e)
+        raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contact")
+
 @router.get("/contacts/{contact_id}", tags=["Contact"], response_model=ContactOut)
 async def read_contact(
     contact_id: int,
-    db: AsyncSession = Depends(get_db)
+    fields: str | None = None,
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    logger.debug(f"[GET /contacts/{contact_id}] Fetching contact")
+    logger.debug("[GET /contacts/%s] Fetching contact, fields=%s", contact_id, fields)
     try:
-        contact = await PhonebookController.get_contact(db, contact_id)
+        contact = await PhonebookController.get_contact(db, contact_id, fields)
         if contact is None:
             msg = f"Contact with id={contact_id} not found"
-            logger.warning(f"[GET /contacts/{contact_id}] {msg}")
+            logger.warning("[GET /contacts/%s] %s", contact_id, msg)
             raise HTTPException(status_code=404, detail=msg)
-        return contact
+        body = json.dumps(contact, ensure_ascii=False, separators=(",", ":"))
+        etag = PhonebookController.contact_etag(contact)
+        return negotiated_response(body, etag, "/contacts/{contact_id}", accept, accept_encoding, if_none_match)
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"[GET /contacts/{contact_id}] Failed to fetch contact: {e}")
+        logger.exception("[GET /contacts/%s] Failed to fetch contact: %s", contact_id, e)
         raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contact")
 
 @router.put("/contacts/{contact_id}", tags=["Contact"], response_model=ContactOut)
 async def update_contact(
     contact_id: int,
     contact: ContactUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
-    logger.debug(f"[PUT /contacts/{contact_id}] Updating with data: {contact}")
+    logger.debug("[PUT /contacts/%s] Updating with data: %s", contact_id, contact)
     try:
         updated = await PhonebookController.update_contact(db, contact_id, contact)
         if updated is None:
             msg = f"Contact with id={contact_id} not found"
-            logger.warning(f"[PUT /contacts/{contact_id}] {msg}")
+            logger.warning("[PUT /contacts/%s] %s", contact_id, msg)
             raise HTTPException(status_code=404, detail=msg)
         return updated
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"[PUT /contacts/{contact_id}] Failed to update contact: {e}")
+        logger.exception("[PUT /contacts/%s] Failed to update contact: %s", contact_id, e)
         raise HTTPException(status_code=500, detail="Internal Server Error: Could not update contact")
 
 @router.delete("/contacts/{contact_id}", tags=["Contact"], response_model=ContactOut)
 async def delete_contact(
     contact_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
-    logger.debug(f"[DELETE /contacts/{contact_id}] Deleting contact")
+    logger.debug("[DELETE /contacts/%s] Deleting contact", contact_id)
     try:
         deleted = await PhonebookController.delete_contact(db, contact_id)
         if deleted is None:
             msg = f"Contact with id={contact_id} not found"
-            logger.warning(f"[DELETE /contacts/{contact_id}] {msg}")
+            logger.warning("[DELETE /contacts/%s] %s", contact_id, msg)
             raise HTTPException(status_code=404, detail=msg)
         return deleted
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"[DELETE /contacts/{contact_id}] Failed to delete contact: {e}")
+        logger.exception("[DELETE /contacts/%s] Failed to delete contact: %s", contact_id, e)
         raise HTTPException(status_code=500, detail="Internal Server Error: Could not delete contact")
 
 
 @router.delete("/contacts/debug/all", tags=["Debug"])
 async def delete_all_contacts(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     logger.debug("[DELETE /contacts/debug/all] Deleting all contacts")
     try:
         await PhonebookController.delete_all_contacts(db)
         return {"message": "All contacts have been deleted."}
     except Exception as e:
-        logger.exception(f"[DELETE /contacts/debug/all] Failed to delete all contacts: {e}")
+        logger.exception("[DELETE /contacts/debug/all] Failed to delete all contacts: %s", e)
         raise HTTPException(status_code=500, detail="Internal Server Error: Could not delete all contacts")
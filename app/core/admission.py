@@ -0,0 +1,155 @@
+import asyncio
+import math
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import admission_in_flight, admission_queue_depth, admission_shed_total
+from app.dependencies.redis import get_redis_client
+
+logger = get_logger("admission", settings.LOG_LEVEL)
+
+# Refill and take from a per-client bucket in one round trip; Redis TIME keeps workers on the same clock.
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local allowed = 0
+local retry_after_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after_ms = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, retry_after_ms}
+"""
+
+
+class RouteClassLimiter:
+    """Concurrency limit for one route class with a short, bounded wait queue in front of it."""
+
+    def __init__(self, route_class: str, limit: int, max_queue: int):
+        self.route_class = route_class
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    async def acquire(self, timeout: float) -> str | None:
+        """Return ``None`` once a slot is held, or the reason the request was shed."""
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        elif self._waiting >= self.max_queue:
+            return "queue_full"
+        else:
+            self._waiting += 1
+            admission_queue_depth.labels(route_class=self.route_class).set(self._waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                return "queue_timeout"
+            finally:
+                self._waiting -= 1
+                admission_queue_depth.labels(route_class=self.route_class).set(self._waiting)
+        admission_in_flight.labels(route_class=self.route_class).inc()
+        return None
+
+    def release(self):
+        admission_in_flight.labels(route_class=self.route_class).dec()
+        self._semaphore.release()
+
+
+class AdmissionControlMiddleware:
+    """Shed load early instead of letting requests pile up on the database pool.
+
+    API requests are rate limited per client with a Redis token bucket (429), then admitted
+    against a per-route-class concurrency limit with a short wait queue (503 when it is full
+    or the wait times out). Both responses carry ``Retry-After``.
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = "/phonebook"):
+        self.app = app
+        self.prefix = prefix
+        self.limiters = {
+            "read": RouteClassLimiter("read", settings.ADMISSION_MAX_READS, settings.ADMISSION_MAX_QUEUE),
+            "write": RouteClassLimiter("write", settings.ADMISSION_MAX_WRITES, settings.ADMISSION_MAX_QUEUE),
+            "search": RouteClassLimiter("search", settings.ADMISSION_MAX_SEARCHES, settings.ADMISSION_MAX_QUEUE),
+        }
+        self._token_bucket = None
+
+    @staticmethod
+    def route_class(method: str, path: str) -> str:
+        if path.endswith(("/changes", "/export")):
+            return "stream"
+        if path.endswith(("/search", "/autocomplete")):
+            return "search"
+        if path.endswith("/batch-get"):
+            return "read"
+        return "read" if method in ("GET", "HEAD") else "write"
+
+    @staticmethod
+    def client_id(scope: Scope) -> str:
+        if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+            for header, value in scope["headers"]:
+                if header == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _take_token(self, client_id: str) -> int:
+        """Return 0 when the client may proceed, otherwise the milliseconds until its next token."""
+        try:
+            cache = get_redis_client()
+            if self._token_bucket is None:
+                self._token_bucket = cache.register_script(TOKEN_BUCKET_SCRIPT)
+            allowed, retry_after_ms = await self._token_bucket(
+                keys=[f"ratelimit:{client_id}"],
+                args=[settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST],
+                client=cache
+            )
+            return 0 if allowed else int(retry_after_ms)
+        except Exception as e:
+            # Rate limiting must not take the API down with Redis; fail open.
+            logger.warning("Rate limit check failed for client=%s, allowing request: %s", client_id, e)
+            return 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.ADMISSION_CONTROL_ENABLED or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.route_class(scope["method"], scope["path"])
+        if settings.RATE_LIMIT_ENABLED:
+            retry_after_ms = await self._take_token(self.client_id(scope))
+            if retry_after_ms:
+                admission_shed_total.labels(route_class=route_class, reason="rate_limit").inc()
+                await self._reject(scope, receive, send, 429, "Too Many Requests", math.ceil(retry_after_ms / 1000))
+                return
+
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            # Change feed and export streams stay open for minutes; holding a read slot would starve short requests.
+            await self.app(scope, receive, send)
+            return
+        reason = await limiter.acquire(settings.ADMISSION_QUEUE_TIMEOUT)
+        if reason is not None:
+            admission_shed_total.labels(route_class=route_class, reason=reason).inc()
+            logger.warning("Shedding %s request to %s: %s", route_class, scope["path"], reason)
+            await self._reject(scope, receive, send, 503, "Service Unavailable: server is overloaded", settings.ADMISSION_RETRY_AFTER)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, retry_after: int):
+        response = JSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(1, retry_after))})
+        await response(scope, receive, send)
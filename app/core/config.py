@@ -6,17 +6,95 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "postgresql+asyncpg://postgres:postgres@db:5432/phonebook"
     HOST_URL: str = "http://localhost:8000/phonebook/contacts"
 
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: float = 30.0
+    DB_SLOW_QUERY_SECONDS: float = 0.5
+
+    DATABASE_REPLICA_URLS: list[str] = []
+    READ_REPLICA_STRATEGY: str = "round_robin"
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
 
     CACHE_TTL: int = 3600
+    CONTACT_CACHE_TTL: int = 3600
+
+    L1_CACHE_ENABLED: bool = True
+    L1_CACHE_TTL: float = 5.0
+    L1_CACHE_MAX_ENTRIES: int = 10000
+    L1_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_INVALIDATION_CHANNEL: str = "contacts:invalidations"
+
+    CACHE_STALE_TTL: int = 60
+    CACHE_LOCK_TTL: float = 5.0
+    CACHE_LOCK_WAIT: float = 2.0
+    CACHE_LOCK_POLL_INTERVAL: float = 0.05
 
     LOG_LEVEL: str = "DEBUG"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_JSON: bool = True
+    LOG_SAMPLE_RATE: float = 1.0
 
     PAGINATION_DEFAULT_PAGE: int = 10
 
+    SEARCH_TRIGRAM_ENABLED: bool = True
+
+    BULK_BATCH_SIZE: int = 1000
+    BULK_MAX_BATCH_SIZE: int = 5000
+
+    EXPORT_BATCH_SIZE: int = 1000
+
+    BATCH_GET_MAX_IDS: int = 1000
+
+    PHONE_DEFAULT_COUNTRY_CODE: str = "1"
+    PHONE_NATIONAL_NUMBER_LENGTH: int = 10
+    PHONE_CACHE_TTL: int = 3600
+    PHONE_NEGATIVE_CACHE_TTL: int = 60
+
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_READS: int = 200
+    ADMISSION_MAX_WRITES: int = 50
+    ADMISSION_MAX_SEARCHES: int = 20
+    ADMISSION_MAX_QUEUE: int = 100
+    ADMISSION_QUEUE_TIMEOUT: float = 0.5
+    ADMISSION_RETRY_AFTER: int = 1
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PER_SECOND: float = 100.0
+    RATE_LIMIT_BURST: int = 200
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+
+    INGEST_QUEUE_SIZE: int = 10000
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_FLUSH_INTERVAL: float = 0.05
+    INGEST_STATUS_TTL: int = 3600
+    INGEST_DRAIN_TIMEOUT: float = 10.0
+
+    CONTACT_COUNT_RECONCILE_INTERVAL: float = 300.0
+    CONTACT_COUNT_ESTIMATE_THRESHOLD: int = 1_000_000
+
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    CHANGE_FEED_CHANNEL: str = "contacts:changes"
+    CHANGE_FEED_RETENTION: int = 10000
+    CHANGE_FEED_HEARTBEAT: float = 15.0
+    CHANGE_FEED_SUBSCRIBER_BUFFER: int = 1000
+    CHANGE_FEED_MAX_STREAM_SECONDS: float = 300.0
+
 
 settings = Settings()
 
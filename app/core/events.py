@@ -1,7 +1,37 @@
-from app.dependencies.database import create_tables
-from app.dependencies.database import async_engine
+import asyncio
+from app.dependencies.database import create_tables, create_sort_indexes, create_search_indexes, add_phone_normalized_column
+from app.dependencies.database import async_engine, AsyncSessionFactory, dispose_engines
+from app.dependencies.redis import connect_redis, close_redis
+from app.core.logger import start_logging, stop_logging
+from app.services.phonebook_db import ContactsDBService
+from app.services.autocomplete_index import autocomplete_index
+from app.services.change_feed import change_feed
+from app.services.phonebook_controller import PhonebookController
+
+_background_tasks: list[asyncio.Task] = []
 
 async def on_startup():
+    start_logging()
     await create_tables(async_engine)
+    await create_sort_indexes(async_engine)
+    await add_phone_normalized_column(async_engine)
+    ContactsDBService.trigram_enabled = await create_search_indexes(async_engine)
+    await connect_redis()
+    async with AsyncSessionFactory() as session:
+        await ContactsDBService.backfill_normalized_phones(session)
+        autocomplete_index.build(await ContactsDBService.get_autocomplete_rows(session))
+    await PhonebookController.reconcile_contact_count()
+    _background_tasks.append(asyncio.create_task(PhonebookController.listen_for_invalidations()))
+    _background_tasks.append(asyncio.create_task(change_feed.listen()))
+    _background_tasks.append(asyncio.create_task(PhonebookController.reconcile_contact_count_periodically()))
+    _background_tasks.append(asyncio.create_task(PhonebookController.run_ingest_flusher()))
 
-
+async def on_shutdown():
+    await PhonebookController.drain_ingest_queue()
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    await close_redis()
+    await dispose_engines()
+    stop_logging()
@@ -1,7 +1,100 @@
+import atexit
+import json
 import logging
+import queue
+import random
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.core.config import Logs
 from app.core.config import settings
 
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+log_sampled_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{line} - request_id={request_id}" if request_id else line
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp the correlation id on each record and drop DEBUG/INFO lines of requests that were not sampled."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return record.levelno > logging.INFO or log_sampled_var.get()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records without formatting them; the listener thread renders the message.
+
+    Only the traceback is rendered here, because it has to be captured while the frames are alive.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def config_handler(logger_level: str = settings.LOG_LEVEL):
+    ch = logging.StreamHandler()
+    ch.setLevel(Logs.LOG_LEVELS.get(logger_level))
+    formatter = JsonFormatter() if settings.LOG_JSON else TextFormatter(Logs.LOG_FORMAT)
+    ch.setFormatter(formatter)
+    return ch
+
+
+def start_logging():
+    global _listener
+    if _listener is None:
+        _listener = QueueListener(_log_queue, config_handler("DEBUG"))
+        _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread; loggers keep queueing until ``start_logging``."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_queue_handler() -> QueueHandler:
+    global _queue_handler
+    if _queue_handler is None:
+        _queue_handler = DeferredQueueHandler(_log_queue)
+        _queue_handler.addFilter(RequestContextFilter())
+        start_logging()
+        atexit.register(stop_logging)
+    return _queue_handler
 
 
 def get_logger(name: str, logger_level: str = settings.LOG_LEVEL):
@@ -9,14 +102,37 @@ def get_logger(name: str, logger_level: str = settings.LOG_LEVEL):
     logger.setLevel(Logs.LOG_LEVELS.get(logger_level))
     logger.propagate = False
     if not logger.handlers:
-        ch = config_handler(logger_level)
-        logger.addHandler(ch)
+        logger.addHandler(get_queue_handler())
     return logger
 
-def config_handler(logger_level: str = settings.LOG_LEVEL):
-    ch = logging.StreamHandler()
-    ch.setLevel(Logs.LOG_LEVELS.get(logger_level))
-    formatter = logging.Formatter(Logs.LOG_FORMAT)
-    ch.setFormatter(formatter)
-    return ch
 
+class RequestContextMiddleware:
+    """Assign every HTTP request a correlation id (from ``X-Request-ID`` when given) and a sampling decision."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for header, value in scope["headers"]:
+            if header == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        request_token = request_id_var.set(request_id)
+        sampled_token = log_sampled_var.set(random.random() < settings.LOG_SAMPLE_RATE)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(request_token)
+            log_sampled_var.reset(sampled_token)
@@ -3,9 +3,10 @@ from prometheus_client import (
     Histogram,
     Gauge,
     CollectorRegistry,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
 )
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time
 
 custom_registry = CollectorRegistry()
@@ -13,14 +14,14 @@ custom_registry = CollectorRegistry()
 http_requests_total = Counter(
     "http_requests_total",
     "Total HTTP requests",
-    ["method", "endpoint"],
+    ["method", "endpoint", "status"],
     registry=custom_registry
 )
 
 http_request_duration_seconds = Histogram(
     "http_request_duration_seconds",
     "Duration of HTTP requests in seconds",
-    ["endpoint"],
+    ["method", "endpoint"],
     registry=custom_registry
 )
 
@@ -44,16 +45,212 @@ cache_hits_total = Counter(
     registry=custom_registry
 )
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        duration = time.time() - start_time
-        endpoint = request.url.path
-        method = request.method
-        http_requests_total.labels(method=method, endpoint=endpoint).inc()
-        http_request_duration_seconds.labels(endpoint=endpoint).observe(duration)
-        return response
+cache_tier_hits_total = Counter(
+    "cache_tier_hits_total",
+    "Cache hits per tier (l1 = in-process, l2 = redis)",
+    ["tier", "endpoint"],
+    registry=custom_registry
+)
+
+cache_tier_misses_total = Counter(
+    "cache_tier_misses_total",
+    "Cache misses per tier (l1 = in-process, l2 = redis)",
+    ["tier", "endpoint"],
+    registry=custom_registry
+)
+
+cache_coalesced_waits_total = Counter(
+    "cache_coalesced_waits_total",
+    "Cache misses that waited on an in-flight load in the same worker",
+    ["endpoint"],
+    registry=custom_registry
+)
+
+cache_lock_contention_total = Counter(
+    "cache_lock_contention_total",
+    "Cache loads that found the cross-worker refresh lock already held",
+    ["endpoint"],
+    registry=custom_registry
+)
+
+cache_stale_served_total = Counter(
+    "cache_stale_served_total",
+    "Stale cache entries served while a refresh runs in the background",
+    ["endpoint"],
+    registry=custom_registry
+)
+
+local_cache_entries = Gauge(
+    "local_cache_entries",
+    "Entries held in the in-process L1 cache",
+    registry=custom_registry
+)
+
+local_cache_bytes = Gauge(
+    "local_cache_bytes",
+    "Encoded size of values held in the in-process L1 cache",
+    registry=custom_registry
+)
+
+cache_invalidations_total = Counter(
+    "cache_invalidations_total",
+    "Cache generation bumps triggered by writes",
+    registry=custom_registry
+)
+
+autocomplete_index_entries = Gauge(
+    "autocomplete_index_entries",
+    "Contacts held in the in-process autocomplete index",
+    registry=custom_registry
+)
+
+autocomplete_index_memory_bytes = Gauge(
+    "autocomplete_index_memory_bytes",
+    "Approximate memory used by the in-process autocomplete index",
+    registry=custom_registry
+)
+
+autocomplete_index_build_seconds = Gauge(
+    "autocomplete_index_build_seconds",
+    "Duration of the last full autocomplete index build",
+    registry=custom_registry
+)
+
+db_pool_size = Gauge(
+    "db_pool_size",
+    "Configured size of the database connection pool",
+    registry=custom_registry
+)
+
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    registry=custom_registry
+)
+
+db_pool_overflow = Gauge(
+    "db_pool_overflow",
+    "Database connections open beyond the configured pool size",
+    registry=custom_registry
+)
+
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    registry=custom_registry
+)
+
+admission_in_flight = Gauge(
+    "admission_in_flight",
+    "Requests currently admitted, per route class",
+    ["route_class"],
+    registry=custom_registry
+)
+
+admission_queue_depth = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for a concurrency slot, per route class",
+    ["route_class"],
+    registry=custom_registry
+)
+
+admission_shed_total = Counter(
+    "admission_shed_total",
+    "Requests rejected by admission control (rate_limit, queue_full or queue_timeout)",
+    ["route_class", "reason"],
+    registry=custom_registry
+)
+
+ingest_queue_depth = Gauge(
+    "ingest_queue_depth",
+    "Contacts waiting in the write-behind ingestion queue",
+    registry=custom_registry
+)
+
+ingest_items_total = Counter(
+    "ingest_items_total",
+    "Write-behind ingestion items by status (queued, created, conflict, failed)",
+    ["status"],
+    registry=custom_registry
+)
+
+change_feed_subscribers = Gauge(
+    "change_feed_subscribers",
+    "Change feed streams currently open on this worker",
+    registry=custom_registry
+)
+
+change_feed_events_total = Counter(
+    "change_feed_events_total",
+    "Contact change events published to the change feed by type (created, updated, deleted, cleared)",
+    ["type"],
+    registry=custom_registry
+)
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+cache_operation_duration_seconds = Histogram(
+    "cache_operation_duration_seconds",
+    "Latency of Redis cache operations issued by the controller",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+    registry=custom_registry
+)
+
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds",
+    "Latency of database statements, labelled by statement type",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+    registry=custom_registry
+)
+
+serialization_duration_seconds = Histogram(
+    "serialization_duration_seconds",
+    "Time spent validating and encoding response payloads",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+    registry=custom_registry
+)
+
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+
+class PrometheusMiddleware:
+    """Pure ASGI request metrics, labelled by the matched route template rather than the raw path."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            # The router stores the matched APIRoute in the scope; its path is the template, e.g. /contacts/{contact_id}.
+            route = scope.get("route")
+            endpoint = getattr(route, "path", UNMATCHED_ENDPOINT)
+            method = scope["method"]
+            http_requests_total.labels(method=method, endpoint=endpoint, status=str(status_code)).inc()
+            http_request_duration_seconds.labels(method=method, endpoint=endpoint).observe(duration)
+
+
+def metrics_text() -> tuple[bytes, str]:
+    return generate_latest(custom_registry), CONTENT_TYPE_LATEST
 
 
 def metrics_json():
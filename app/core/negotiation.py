@@ -0,0 +1,116 @@
+import gzip
+import json
+import msgpack
+from fastapi import Response
+from app.core.config import settings
+from app.core.metrics import serialization_duration_seconds
+from app.services.local_cache import local_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack")
+VARY = "Accept, Accept-Encoding"
+
+
+def _parse_qualities(header: str | None) -> dict[str, float]:
+    qualities = {}
+    for part in (header or "").split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[name.lower()] = max(q, qualities.get(name.lower(), 0.0))
+    return qualities
+
+
+def choose_media_type(accept: str | None) -> str:
+    """Serve MessagePack only when the client prefers it over JSON; JSON stays the default."""
+    qualities = _parse_qualities(accept)
+    msgpack_q = max(qualities.get(name, 0.0) for name in MSGPACK_ALIASES)
+    json_q = max(qualities.get(JSON, 0.0), qualities.get("application/*", 0.0), qualities.get("*/*", 0.0))
+    if not qualities:
+        json_q = 1.0
+    return MSGPACK if msgpack_q > json_q else JSON
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Pick the best supported content coding, preferring brotli over gzip on equal quality."""
+    qualities = _parse_qualities(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        q = qualities.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _variant_etag(etag: str, media_type: str, coding: str | None) -> str:
+    suffix = ("-msgpack" if media_type == MSGPACK else "") + (f"-{coding}" if coding else "")
+    return f'{etag[:-1]}{suffix}"' if suffix else etag
+
+
+def _encode(body: str, media_type: str, coding: str | None) -> bytes:
+    data = msgpack.packb(json.loads(body)) if media_type == MSGPACK else body.encode()
+    if coding == "br":
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    if coding == "gzip":
+        return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+    return data
+
+
+def negotiated_response(
+    body: str,
+    etag: str,
+    endpoint: str,
+    accept: str | None = None,
+    accept_encoding: str | None = None,
+    if_none_match: str | None = None,
+    headers: dict | None = None
+) -> Response:
+    """Render a cached JSON body in the representation the client asked for.
+
+    Each representation gets its own ETag derived from the content hash, so encoded bytes are
+    cached per worker under that ETag and conditional requests are answered before any encoding.
+    Bodies under ``COMPRESSION_MIN_BYTES`` are not compressed.
+    """
+    media_type = choose_media_type(accept)
+    coding = choose_encoding(accept_encoding) if len(body) >= settings.COMPRESSION_MIN_BYTES else None
+    variant_etag = _variant_etag(etag, media_type, coding)
+    headers = {**(headers or {}), "ETag": variant_etag, "Vary": VARY}
+    if etag_matches(if_none_match, variant_etag):
+        return Response(status_code=304, headers=headers)
+
+    if media_type == JSON and coding is None:
+        content = body.encode()
+    else:
+        key = f"encoded:{variant_etag}"
+        content = local_cache.get(key)
+        if content is None:
+            with serialization_duration_seconds.labels(endpoint=endpoint).time():
+                content = _encode(body, media_type, coding)
+            local_cache.set(key, content, len(content))
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=content, media_type=media_type, headers=headers)
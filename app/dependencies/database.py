@@ -1,20 +1,184 @@
+import itertools
+import math
+import time
+from fastapi import Request, Response
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, async_sessionmaker
+from sqlalchemy import event, inspect, text, make_url
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import (
+    db_pool_size,
+    db_pool_checked_out,
+    db_pool_overflow,
+    db_pool_checkout_wait_seconds,
+    db_query_duration_seconds
+)
+
+logger = get_logger("database", settings.LOG_LEVEL)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - start)
+
+
+def engine_options(database_url: str) -> dict:
+    url = make_url(database_url)
+    options = {"echo": settings.DB_ECHO}
+    if url.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if url.drivername == "postgresql+asyncpg":
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        }
+    return options
+
+
+def register_pool_metrics(engine: AsyncEngine):
+    pool = engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return
+    db_pool_size.set_function(pool.size)
+    db_pool_checked_out.set_function(pool.checkedout)
+    db_pool_overflow.set_function(lambda: max(pool.overflow(), 0))
+
+
+STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CREATE"}
+
+
+def statement_type(statement: str) -> str:
+    words = statement.split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in STATEMENT_TYPES else "OTHER"
+
+
+def register_query_metrics(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
 
-async_engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        db_query_duration_seconds.labels(statement=statement_type(statement)).observe(duration)
+        if settings.DB_SLOW_QUERY_SECONDS and duration >= settings.DB_SLOW_QUERY_SECONDS:
+            logger.warning("Slow query (%.1f ms): %s", duration * 1000, " ".join(statement.split())[:500])
+
+
+async_engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+register_pool_metrics(async_engine)
+register_query_metrics(async_engine)
 AsyncSessionFactory = async_sessionmaker(
     bind=async_engine,
     expire_on_commit=False,
     autoflush=False,
 )
 
+replica_engines = [create_async_engine(url, **engine_options(url)) for url in settings.DATABASE_REPLICA_URLS]
+for engine in replica_engines:
+    register_query_metrics(engine)
+ReplicaSessionFactories = [
+    async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    for engine in replica_engines
+]
+_replica_counter = itertools.count()
+
+READ_YOUR_WRITES_COOKIE = "phonebook_primary_until"
+
 Base = declarative_base()
 
-async def get_db():
+def pick_read_session_factory():
+    if not ReplicaSessionFactories:
+        return AsyncSessionFactory
+    if settings.READ_REPLICA_STRATEGY == "least_connections":
+        index = min(range(len(replica_engines)), key=lambda i: replica_engines[i].pool.checkedout())
+    else:
+        index = next(_replica_counter) % len(ReplicaSessionFactories)
+    return ReplicaSessionFactories[index]
+
+def _reads_own_writes(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+async def get_read_db(request: Request):
+    factory = AsyncSessionFactory if _reads_own_writes(request) else pick_read_session_factory()
+    async with factory() as session:
+        session.info["replica"] = factory is not AsyncSessionFactory
+        yield session
+
+async def get_write_db(response: Response):
+    if replica_engines and settings.READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            str(time.time() + settings.READ_YOUR_WRITES_SECONDS),
+            max_age=math.ceil(settings.READ_YOUR_WRITES_SECONDS),
+            httponly=True
+        )
     async with AsyncSessionFactory() as session:
         yield session
 
+async def dispose_engines():
+    for engine in [async_engine, *replica_engines]:
+        await engine.dispose()
+
 async def create_tables(engine: AsyncEngine):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+async def create_sort_indexes(engine: AsyncEngine):
+    """Create the keyset sort index on tables that ``create_all`` left untouched because they already existed."""
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_contacts_name_sort ON "Contacts" (last_name, first_name, id)'
+        ))
+
+async def add_phone_normalized_column(engine: AsyncEngine):
+    """Add the normalized phone column and its unique index to tables created before they existed."""
+    def has_column(sync_conn) -> bool:
+        return any(c["name"] == "phone_normalized" for c in inspect(sync_conn).get_columns("Contacts"))
+
+    async with engine.begin() as conn:
+        if await conn.run_sync(has_column):
+            return
+        logger.info("Adding phone_normalized column to Contacts")
+        await conn.execute(text('ALTER TABLE "Contacts" ADD COLUMN phone_normalized VARCHAR(16)'))
+        await conn.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_contacts_phone_normalized ON "Contacts" (phone_normalized)'
+        ))
+
+async def create_search_indexes(engine: AsyncEngine) -> bool:
+    if not settings.SEARCH_TRIGRAM_ENABLED or engine.dialect.name != "postgresql":
+        logger.info("Trigram search disabled for dialect '%s', using plain ILIKE search", engine.dialect.name)
+        return False
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        async with engine.begin() as conn:
+            for column in ("first_name", "last_name", "phone"):
+                await conn.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS ix_contacts_{column}_trgm '
+                    f'ON "Contacts" USING gin ({column} gin_trgm_ops)'
+                ))
+        logger.info("Trigram search indexes are ready")
+        return True
+    except Exception as e:
+        logger.warning("pg_trgm is unavailable, falling back to plain ILIKE search: %s", e)
+        return False
@@ -1,12 +1,36 @@
-import redis
-from functools import lru_cache
+import redis.asyncio as redis
 from app.core.config import settings
 
-@lru_cache()
-def get_redis_client():
-    return redis.Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        db=settings.REDIS_DB,
-        decode_responses=True
-    )
+_redis_pool: redis.ConnectionPool | None = None
+_redis_client: redis.Redis | None = None
+
+
+def get_redis_client() -> redis.Redis:
+    global _redis_pool, _redis_client
+    if _redis_client is None:
+        _redis_pool = redis.ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True
+        )
+        _redis_client = redis.Redis(connection_pool=_redis_pool)
+    return _redis_client
+
+async def connect_redis():
+    client = get_redis_client()
+    await client.ping()
+    return client
+
+async def close_redis():
+    global _redis_pool, _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+    if _redis_pool is not None:
+        await _redis_pool.disconnect()
+    _redis_client = None
+    _redis_pool = None
@@ -1,9 +1,11 @@
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 from sqlalchemy.exc import SQLAlchemyError
-from app.core.metrics import PrometheusMiddleware, metrics_json
+from app.core.metrics import PrometheusMiddleware, metrics_json, metrics_text
+from app.core.logger import RequestContextMiddleware
+from app.core.admission import AdmissionControlMiddleware
 from fastapi import FastAPI
 from app.api import api_router
-from app.core.events import on_startup
+from app.core.events import on_startup, on_shutdown
 from app.core.exceptions import (
     http_exception_handler,
     sqlalchemy_exception_handler,
@@ -13,13 +15,21 @@ from app.core.exceptions import (
 app = FastAPI(title="Phonebook App", version="0.1.0")
 app.include_router(api_router)
 
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(PrometheusMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 app.add_exception_handler(HTTPException, http_exception_handler)
 app.add_exception_handler(SQLAlchemyError, sqlalchemy_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 app.add_event_handler("startup", on_startup)
+app.add_event_handler("shutdown", on_shutdown)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    content, media_type = metrics_text()
+    return Response(content=content, media_type=media_type)
 
 @app.get("/metrics/json")
 def metrics_json_endpoint():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from app.dependencies.database import Base
 
 class Contact(Base):
@@ -8,4 +8,10 @@ class Contact(Base):
     first_name = Column(String(80), nullable=False, index=True)
     last_name = Column(String(80), nullable=False, index=True)
     phone = Column(String, unique=True, nullable=False, index=True)
+    phone_normalized = Column(String(16))
     address = Column(String)
+
+    __table_args__ = (
+        Index("ix_contacts_name_sort", "last_name", "first_name", "id"),
+        Index("ix_contacts_phone_normalized", "phone_normalized", unique=True),
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 class ContactBase(BaseModel):
     first_name: str
@@ -22,3 +22,42 @@ class ContactOut(ContactBase):
     model_config = {
         "from_attributes": True
     }
+
+class ContactSuggestion(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    phone: str
+
+class BulkRowResult(BaseModel):
+    index: int
+    status: Literal["updated", "conflict", "invalid"]
+    phone: str | None = None
+    detail: str | None = None
+
+class BulkImportResult(BaseModel):
+    received: int = 0
+    created: int = 0
+    updated: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    batches: int = 0
+    rows: list[BulkRowResult] = []
+
+class ContactBatchGet(BaseModel):
+    ids: list[int]
+
+class ContactBatchResult(BaseModel):
+    contacts: list[ContactOut]
+    missing: list[int]
+
+class ContactStats(BaseModel):
+    total: int
+    exact: bool
+    reconciled_at: float | None = None
+
+class IngestStatus(BaseModel):
+    tracking_id: str
+    status: Literal["queued", "created", "conflict", "failed"]
+    contact_id: int | None = None
+    detail: str | None = None
@@ -0,0 +1,203 @@
+import re
+import sys
+import time
+from bisect import bisect_left, insort
+from app.core.logger import get_logger
+from app.core.config import settings
+from app.services.phone_numbers import to_e164
+from app.core.metrics import (
+    autocomplete_index_entries,
+    autocomplete_index_memory_bytes,
+    autocomplete_index_build_seconds
+)
+
+logger = get_logger("autocomplete_index", settings.LOG_LEVEL)
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone(phone: str) -> str:
+    return _NON_DIGITS.sub("", phone or "")
+
+
+def normalize_name(name: str) -> str:
+    return " ".join((name or "").lower().split())
+
+
+class AutocompleteIndex:
+    """Per-worker prefix index over phone digits and lowercased names.
+
+    Keys live in two sorted lists of (key, contact_id) pairs, so a prefix lookup
+    is a bisect followed by a short forward scan.
+    """
+
+    # Below this many list edits, shifting the list once per edit is cheaper than rebuilding it.
+    SPLICE_MIN_EDITS = 64
+
+    def __init__(self):
+        self._phones: list[tuple[str, int]] = []
+        self._names: list[tuple[str, int]] = []
+        self._contacts: dict[int, dict] = {}
+        self._memory_bytes = 0
+
+    def __len__(self):
+        return len(self._contacts)
+
+    @staticmethod
+    def _phone_keys(phone: str) -> list[str]:
+        # Index the digits as stored, the E.164 digits and, for the default country, the national
+        # number, so "555010", "1555010" and "+1 555 010" all find "+1 (555) 010-2030".
+        keys = {normalize_phone(phone)}
+        e164 = to_e164(phone)
+        if e164:
+            digits = e164[1:]
+            keys.add(digits)
+            if digits.startswith(settings.PHONE_DEFAULT_COUNTRY_CODE):
+                keys.add(digits[len(settings.PHONE_DEFAULT_COUNTRY_CODE):])
+        return sorted(k for k in keys if k)
+
+    @staticmethod
+    def _keys_for(contact: dict) -> tuple[list[str], list[str]]:
+        first = normalize_name(contact["first_name"])
+        last = normalize_name(contact["last_name"])
+        names = {first, last, f"{first} {last}".strip()}
+        return AutocompleteIndex._phone_keys(contact["phone"]), sorted(n for n in names if n)
+
+    @staticmethod
+    def _entry_size(key: str, contact_id: int) -> int:
+        return sys.getsizeof((key, contact_id)) + sys.getsizeof(key)
+
+    def build(self, contacts):
+        start = time.perf_counter()
+        self._phones = []
+        self._names = []
+        self._contacts = {}
+        self._memory_bytes = 0
+        for contact in contacts:
+            phones, names = self._add(contact)
+            self._phones.extend(phones)
+            self._names.extend(names)
+        self._phones.sort()
+        self._names.sort()
+        duration = time.perf_counter() - start
+        autocomplete_index_build_seconds.set(duration)
+        self._publish_metrics()
+        logger.info("Autocomplete index built with %s contacts in %.3fs", len(self._contacts), duration)
+
+    def _entries(self, contact: dict) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+        phones, names = self._keys_for(contact)
+        return [(key, contact["id"]) for key in phones], [(key, contact["id"]) for key in names]
+
+    def _add(self, contact: dict) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+        """Record ``contact`` and return the phone and name entries the sorted lists still need."""
+        contact_id = contact["id"]
+        self._contacts[contact_id] = {
+            "id": contact_id,
+            "first_name": contact["first_name"],
+            "last_name": contact["last_name"],
+            "phone": contact["phone"],
+        }
+        self._memory_bytes += sys.getsizeof(self._contacts[contact_id])
+        phones, names = self._entries(contact)
+        self._memory_bytes += sum(self._entry_size(*entry) for entry in phones + names)
+        return phones, names
+
+    def _forget(self, contact_id: int) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+        """Drop ``contact_id`` and return the phone and name entries to take out of the sorted lists."""
+        contact = self._contacts.pop(contact_id, None)
+        if contact is None:
+            return [], []
+        self._memory_bytes -= sys.getsizeof(contact)
+        phones, names = self._entries(contact)
+        self._memory_bytes -= sum(self._entry_size(*entry) for entry in phones + names)
+        return phones, names
+
+    @staticmethod
+    def _splice(target: list, stale: list, fresh: list) -> list:
+        """Return the sorted ``target`` without ``stale`` and with ``fresh``, in one pass of slice copies."""
+        if len(stale) + len(fresh) < AutocompleteIndex.SPLICE_MIN_EDITS:
+            for entry in stale:
+                pos = bisect_left(target, entry)
+                if pos < len(target) and target[pos] == entry:
+                    del target[pos]
+            for entry in fresh:
+                insort(target, entry)
+            return target
+        cuts = set()
+        for entry in stale:
+            pos = bisect_left(target, entry)
+            if pos < len(target) and target[pos] == entry:
+                cuts.add(pos)
+        # Inserts go before a cut at the same position, so an entry that is removed and re-added stays in place.
+        edits = sorted(
+            [(bisect_left(target, entry), 0, entry) for entry in sorted(fresh)] + [(pos, 1, None) for pos in cuts],
+            key=lambda edit: edit[:2]
+        )
+        merged, start = [], 0
+        for pos, cut, entry in edits:
+            merged += target[start:pos]
+            if cut:
+                start = pos + 1
+            else:
+                merged.append(entry)
+                start = pos
+        merged += target[start:]
+        return merged
+
+    def _apply(self, contacts: list[dict], removed_ids: list[int]):
+        stale_phones, stale_names, fresh_phones, fresh_names = [], [], [], []
+        contacts = list({contact["id"]: contact for contact in contacts}.values())
+        for contact_id in [contact["id"] for contact in contacts] + list(removed_ids):
+            phones, names = self._forget(contact_id)
+            stale_phones += phones
+            stale_names += names
+        for contact in contacts:
+            phones, names = self._add(contact)
+            fresh_phones += phones
+            fresh_names += names
+        self._phones = self._splice(self._phones, stale_phones, fresh_phones)
+        self._names = self._splice(self._names, stale_names, fresh_names)
+        self._publish_metrics()
+
+    def upsert_many(self, contacts: list[dict]):
+        """Add or replace many contacts, rebuilding each sorted list at most once."""
+        self._apply(contacts, [])
+
+    def remove_many(self, contact_ids: list[int]):
+        self._apply([], contact_ids)
+
+    def upsert(self, contact: dict):
+        self.upsert_many([contact])
+
+    def remove(self, contact_id: int):
+        self.remove_many([contact_id])
+
+    def clear(self):
+        self.build([])
+
+    def lookup(self, prefix: str, limit: int = settings.PAGINATION_DEFAULT_PAGE) -> list[dict]:
+        if any(c.isalpha() for c in prefix):
+            target, key = self._names, normalize_name(prefix)
+        else:
+            target, key = self._phones, normalize_phone(prefix)
+        if not key:
+            return []
+        results = []
+        seen = set()
+        pos = bisect_left(target, (key,))
+        while pos < len(target) and len(results) < limit:
+            entry_key, contact_id = target[pos]
+            if not entry_key.startswith(key):
+                break
+            if contact_id not in seen:
+                seen.add(contact_id)
+                results.append(self._contacts[contact_id])
+            pos += 1
+        return results
+
+    def _publish_metrics(self):
+        autocomplete_index_entries.set(len(self._contacts))
+        autocomplete_index_memory_bytes.set(self._memory_bytes)
+
+
+autocomplete_index = AutocompleteIndex()
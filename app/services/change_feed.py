@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import change_feed_subscribers, change_feed_events_total
+from app.dependencies.redis import get_redis_client
+
+logger = get_logger("change_feed", settings.LOG_LEVEL)
+
+# Numbering, logging and publishing happen in one script, so every worker receives events in
+# sequence order and anything a subscriber missed can be read back from the log by sequence.
+PUBLISH_SCRIPT = """
+local seq = 0
+for i = 3, #ARGV do
+    seq = redis.call('INCR', KEYS[1])
+    local payload = '{"seq":' .. seq .. ',' .. string.sub(ARGV[i], 2)
+    redis.call('ZADD', KEYS[2], seq, payload)
+    redis.call('PUBLISH', ARGV[1], payload)
+end
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -tonumber(ARGV[2]) - 1)
+return seq
+"""
+
+
+class ChangeFeed:
+    """Contact change events with a global sequence number, fanned out to every worker over Redis pub/sub.
+
+    The last ``CHANGE_FEED_RETENTION`` events are kept in a sorted set scored by sequence, so a
+    client can resume after a disconnect. Each worker holds one subscription and hands events to
+    its open streams through bounded in-process queues.
+    """
+
+    SEQUENCE_KEY = "contacts:changes:seq"
+    LOG_KEY = "contacts:changes:log"
+
+    def __init__(self):
+        self._subscribers: set[asyncio.Queue] = set()
+
+    async def publish(self, events: list[dict]) -> int | None:
+        if not events:
+            return None
+        cache = get_redis_client()
+        payloads = [json.dumps(event | {"at": time.time()}, separators=(",", ":")) for event in events]
+        seq = await cache.eval(
+            PUBLISH_SCRIPT, 2, self.SEQUENCE_KEY, self.LOG_KEY,
+            settings.CHANGE_FEED_CHANNEL, settings.CHANGE_FEED_RETENTION, *payloads
+        )
+        for event in events:
+            change_feed_events_total.labels(type=event["type"]).inc()
+        return seq
+
+    async def listen(self):
+        """Hand events published by any worker to this worker's streams until cancelled, resubscribing on errors."""
+        while True:
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(settings.CHANGE_FEED_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    event = json.loads(message["data"])
+                    for queue in list(self._subscribers):
+                        try:
+                            queue.put_nowait(event)
+                        except asyncio.QueueFull:
+                            # The stream sees a sequence gap on its next event and reads the rest from the log.
+                            pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Change feed listener failed, resubscribing: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def _read_log(self, after: int, before: int | None = None) -> list[dict]:
+        cache = get_redis_client()
+        rows = await cache.zrangebyscore(self.LOG_KEY, f"({after}", f"({before}" if before is not None else "+inf")
+        return [json.loads(row) for row in rows]
+
+    @staticmethod
+    def _format(event: dict) -> str:
+        return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+    async def stream(self, since: int | None = None) -> AsyncIterator[str]:
+        """Yield server-sent events after sequence ``since`` (or from now), then live events.
+
+        When ``since`` is older than the retained log, or newer than the current sequence, a single
+        ``reset`` event tells the client to reload its data and continue from the current sequence.
+        The stream ends after ``CHANGE_FEED_MAX_STREAM_SECONDS`` and the client reconnects with ``Last-Event-ID``.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHANGE_FEED_SUBSCRIBER_BUFFER)
+        self._subscribers.add(queue)
+        change_feed_subscribers.inc()
+        try:
+            cache = get_redis_client()
+            last = int(await cache.get(self.SEQUENCE_KEY) or 0)
+            if since is not None:
+                backlog = await self._read_log(since)
+                oldest = backlog[0]["seq"] if backlog else last + 1
+                if since > last or oldest > since + 1:
+                    yield self._format({"seq": last, "type": "reset"})
+                else:
+                    for event in backlog:
+                        yield self._format(event)
+                    last = max(last, backlog[-1]["seq"]) if backlog else last
+
+            deadline = time.monotonic() + settings.CHANGE_FEED_MAX_STREAM_SECONDS
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    event = await asyncio.wait_for(queue.get(), min(settings.CHANGE_FEED_HEARTBEAT, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["seq"] <= last:
+                    continue
+                if event["seq"] > last + 1:
+                    for missed in await self._read_log(last, event["seq"]):
+                        yield self._format(missed)
+                yield self._format(event)
+                last = event["seq"]
+        finally:
+            self._subscribers.discard(queue)
+            change_feed_subscribers.dec()
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from typing import Any
+from app.core.config import settings
+from app.core.metrics import local_cache_entries, local_cache_bytes
+
+
+class LocalCache:
+    """Per-worker LRU cache bounded by entry count and byte budget, with a TTL per entry.
+
+    Values are stored already decoded; ``size`` is the length of their encoded form.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.L1_CACHE_MAX_ENTRIES,
+        max_bytes: int = settings.L1_CACHE_MAX_BYTES,
+        ttl: float = settings.L1_CACHE_TTL,
+        enabled: bool = settings.L1_CACHE_ENABLED
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            self._publish_metrics()
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int = 0, ttl: float | None = None):
+        if not self.enabled or size > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+        self._publish_metrics()
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self._pop(key)
+        self._publish_metrics()
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._publish_metrics()
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _publish_metrics(self):
+        local_cache_entries.set(len(self._entries))
+        local_cache_bytes.set(self._bytes)
+
+
+local_cache = LocalCache()
@@ -0,0 +1,31 @@
+import re
+from app.core.config import settings
+
+_NON_DIGITS = re.compile(r"\D")
+E164_MAX_DIGITS = 15
+
+
+def to_e164(
+    phone: str | None,
+    default_country_code: str = settings.PHONE_DEFAULT_COUNTRY_CODE,
+    national_length: int = settings.PHONE_NATIONAL_NUMBER_LENGTH
+) -> str | None:
+    """Normalize a free-form phone number to ``+<digits>``, or ``None`` when it cannot be one.
+
+    Numbers written with ``+`` or ``00`` are taken as international, and so are numbers that
+    already start with ``default_country_code`` followed by a full ``national_length`` number
+    (``15551234567``). Anything else is a national number, so one trunk ``0`` is dropped and
+    ``default_country_code`` is prepended.
+    """
+    raw = (phone or "").strip()
+    digits = _NON_DIGITS.sub("", raw)
+    international = raw.startswith("+")
+    if not international and digits.startswith("00"):
+        digits, international = digits[2:], True
+    if not international and digits.startswith(default_country_code):
+        international = len(digits) == len(default_country_code) + national_length
+    if not international and digits:
+        digits = default_country_code + digits.removeprefix("0")
+    if not digits or len(digits) > E164_MAX_DIGITS:
+        return None
+    return f"+{digits}"
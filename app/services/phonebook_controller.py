@@ -1,147 +1,1016 @@
+import asyncio
+import base64
+import csv
+import hashlib
+import io
 import json
-import logging
+import time
+import uuid
+from typing import AsyncIterator
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from app.schemas.schemas import ContactCreate, ContactUpdate, ContactOut
+from app.schemas.schemas import (
+    ContactCreate,
+    ContactUpdate,
+    ContactOut,
+    BulkImportResult,
+    BulkRowResult,
+    ContactBatchResult,
+    IngestStatus
+)
 from app.services.phonebook_db import ContactsDBService
+from app.services.autocomplete_index import autocomplete_index
+from app.services.local_cache import local_cache
+from app.services.change_feed import change_feed
+from app.services.phone_numbers import to_e164
 from app.dependencies.redis import get_redis_client
+from app.dependencies.database import AsyncSessionFactory, pick_read_session_factory
 from app.core.config import settings
+from app.core.logger import get_logger
 from app.core.metrics import (
     cache_requests_total,
     cache_hits_total,
+    cache_tier_hits_total,
+    cache_tier_misses_total,
+    cache_invalidations_total,
+    cache_coalesced_waits_total,
+    cache_lock_contention_total,
+    cache_stale_served_total,
+    cache_operation_duration_seconds,
+    serialization_duration_seconds,
+    ingest_queue_depth,
+    ingest_items_total,
     contacts_total
 )
 
-logger = logging.getLogger("phonebook_controller")
-logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+logger = get_logger("phonebook_controller", settings.LOG_LEVEL)
+
+contact_list_adapter = TypeAdapter(list[ContactOut])
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that cannot be decoded or was issued for another sort."""
 
 class PhonebookController:
 
+    CACHE_GENERATION_KEY = "contacts:generation"
+    CACHE_INVALIDATED_AT_KEY = "contacts:invalidated_at"
+    WORKER_ID = uuid.uuid4().hex
+    CONTACT_STATS_KEY = "contacts:stats"
+    RELEASE_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    # Only adjust a count that has been reconciled at least once; a missing hash is rebuilt from the database.
+    ADJUST_COUNT_SCRIPT = "if redis.call('exists', KEYS[1]) == 1 then return redis.call('hincrby', KEYS[1], 'total', ARGV[1]) end return false"
+    # Every write bumps the generation before it evicts, so a read-path fill checked against the generation
+    # read before its query either lands before the eviction or is refused.
+    FILL_SCRIPT = """
+if (redis.call('get', KEYS[1]) or '0') ~= ARGV[1] then return 0 end
+for i = 2, #KEYS do
+    redis.call('set', KEYS[i], ARGV[i + 1], 'EX', ARGV[2], 'NX')
+end
+return 1
+"""
+    _inflight: dict[tuple[str, bool], asyncio.Task] = {}
+    _refreshing: dict[str, asyncio.Task] = {}
+    _ingest_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+    _ingest_accepting: bool = True
+
+    @staticmethod
+    async def _get_cache(key: str):
+        cache = get_redis_client()
+        with cache_operation_duration_seconds.labels(operation="get").time():
+            return await cache.get(key)
+
+    @staticmethod
+    async def _get_cache_with_ttl(key: str) -> tuple[str | None, int]:
+        cache = get_redis_client()
+        with cache_operation_duration_seconds.labels(operation="get").time():
+            async with cache.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                value, pttl = await pipe.execute()
+        return value, pttl
+
     @staticmethod
-    def _get_cache(key: str):
+    async def _set_cache(key: str, value: str, expire: int = settings.CACHE_TTL, local_value=None):
+        # Entries outlive CACHE_TTL by CACHE_STALE_TTL so they can be served stale while one worker refreshes them.
         cache = get_redis_client()
-        return cache.get(key)
+        with cache_operation_duration_seconds.labels(operation="set").time():
+            await cache.setex(key, expire + settings.CACHE_STALE_TTL, value)
+        if local_value is not None:
+            local_cache.set(key, local_value, len(value))
 
     @staticmethod
-    def _set_cache(key: str, value: str, expire: int = settings.CACHE_TTL):
+    async def _get_generation() -> int:
+        generation = local_cache.get(PhonebookController.CACHE_GENERATION_KEY)
+        if generation is not None:
+            return generation
         cache = get_redis_client()
-        cache.setex(key, expire, value)
+        with cache_operation_duration_seconds.labels(operation="get").time():
+            generation = await cache.get(PhonebookController.CACHE_GENERATION_KEY)
+        generation = int(generation) if generation else 0
+        local_cache.set(PhonebookController.CACHE_GENERATION_KEY, generation)
+        return generation
+
+    @staticmethod
+    def _set_local_generation(generation: int):
+        current = local_cache.get(PhonebookController.CACHE_GENERATION_KEY)
+        if current is None or generation > current:
+            local_cache.set(PhonebookController.CACHE_GENERATION_KEY, generation)
+
+    @staticmethod
+    async def _clear_cache() -> int:
+        # Entries written under older generations are never read again and expire through CACHE_TTL.
+        cache = get_redis_client()
+        async with cache.pipeline(transaction=True) as pipe:
+            pipe.incr(PhonebookController.CACHE_GENERATION_KEY)
+            pipe.set(PhonebookController.CACHE_INVALIDATED_AT_KEY, time.time())
+            generation, _ = await pipe.execute()
+        PhonebookController._set_local_generation(generation)
+        cache_invalidations_total.inc()
+        logger.info("Cache generation bumped to %s for list and search endpoints.", generation)
+        return generation
+
+    @staticmethod
+    async def _after_write(
+        changed: list[dict] = (),
+        removed: list[int] = (),
+        cleared: bool = False,
+        write_through: bool = False,
+        count_delta: int = 0,
+        stale_numbers: list[str] = (),
+        created_ids: list[int] = ()
+    ):
+        """Invalidate every cache tier after a committed write, tell the other workers and publish change events."""
+        generation = await PhonebookController._clear_cache()
+        if cleared:
+            await PhonebookController._store_contact_stats(0, exact=True)
+        elif count_delta:
+            await PhonebookController._adjust_contact_count(count_delta)
+        if cleared:
+            await PhonebookController._evict_all_contacts()
+        if changed and write_through:
+            await PhonebookController._cache_contacts(changed)
+        elif changed:
+            await PhonebookController._evict_contacts([c["id"] for c in changed])
+        if removed:
+            await PhonebookController._evict_contacts(removed)
+        numbers = {to_e164(c["phone"]) for c in changed} | set(stale_numbers)
+        numbers = sorted(n for n in numbers if n)
+        if numbers and not cleared:
+            cache = get_redis_client()
+            await cache.delete(*[PhonebookController._phone_key(n) for n in numbers])
+
+        message = {
+            "origin": PhonebookController.WORKER_ID,
+            "generation": generation,
+            "changed": [{k: c[k] for k in ("id", "first_name", "last_name", "phone")} for c in changed],
+            "removed": list(removed),
+            "numbers": numbers,
+            "cleared": cleared,
+        }
+        PhonebookController._apply_invalidation(message)
+        cache = get_redis_client()
+        await cache.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+
+        created_ids = set(created_ids)
+        events = [{"type": "cleared", "id": None, "contact": None}] if cleared else []
+        events += [{"type": "created" if c["id"] in created_ids else "updated", "id": c["id"], "contact": c} for c in changed]
+        events += [{"type": "deleted", "id": contact_id, "contact": None} for contact_id in removed]
+        await change_feed.publish(events)
 
     @staticmethod
-    def _clear_cache():
+    def _apply_invalidation(message: dict):
+        if message["cleared"]:
+            local_cache.clear()
+            autocomplete_index.clear()
+        PhonebookController._set_local_generation(message["generation"])
+        local_cache.delete(PhonebookController.CONTACT_STATS_KEY)
+        ids = [c["id"] for c in message["changed"]] + message["removed"]
+        local_cache.delete(*[PhonebookController._contact_key(i) for i in ids])
+        local_cache.delete(*[PhonebookController._phone_key(n) for n in message.get("numbers", ())])
+        autocomplete_index.upsert_many(message["changed"])
+        autocomplete_index.remove_many(message["removed"])
+
+    @staticmethod
+    async def listen_for_invalidations():
+        """Apply invalidations published by other workers until cancelled, resubscribing on errors."""
+        connected_before = False
+        while True:
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                if connected_before:
+                    # Messages published while we were disconnected are lost, so start over from the source.
+                    local_cache.clear()
+                    async with AsyncSessionFactory() as db:
+                        autocomplete_index.build(await ContactsDBService.get_autocomplete_rows(db))
+                connected_before = True
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload["origin"] != PhonebookController.WORKER_ID:
+                        PhonebookController._apply_invalidation(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[Controller] Invalidation listener failed, resubscribing: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    @staticmethod
+    async def _may_cache(db: AsyncSession) -> bool:
+        # A lagging replica may still return rows from before the last write; keep those out of the cache.
+        if not db.info.get("replica"):
+            return True
         cache = get_redis_client()
-        keys = cache.keys("contacts:list:*")
-        keys += cache.keys("search:*")
-        if keys:
-            cache.delete(*keys)
-        logger.info("Cache cleared for list and search endpoints.")
+        invalidated_at = await cache.get(PhonebookController.CACHE_INVALIDATED_AT_KEY)
+        return not invalidated_at or time.time() - float(invalidated_at) > settings.READ_YOUR_WRITES_SECONDS
 
     @staticmethod
-    def _try_fetch_from_cache(key: str, endpoint: str):
+    async def _try_fetch_from_cache(key: str, endpoint: str, track_staleness: bool = False, raw: bool = False):
+        """Return ``(value, stale)``; ``stale`` is only computed when ``track_staleness`` is set.
+
+        With ``raw`` the cached JSON string is returned as-is instead of being decoded.
+        """
         cache_requests_total.labels(endpoint=endpoint).inc()
-        cached = PhonebookController._get_cache(key)
+        value = local_cache.get(key)
+        if value is not None:
+            cache_hits_total.labels(endpoint=endpoint).inc()
+            cache_tier_hits_total.labels(tier="l1", endpoint=endpoint).inc()
+            return value, False
+        cache_tier_misses_total.labels(tier="l1", endpoint=endpoint).inc()
+        stale = False
+        if track_staleness:
+            cached, pttl = await PhonebookController._get_cache_with_ttl(key)
+            stale = 0 <= pttl < settings.CACHE_STALE_TTL * 1000
+        else:
+            cached = await PhonebookController._get_cache(key)
         if cached:
             cache_hits_total.labels(endpoint=endpoint).inc()
-            logger.info(f"[Controller] Returning cached result for key={key}")
-            return json.loads(cached)
-        return None
+            cache_tier_hits_total.labels(tier="l2", endpoint=endpoint).inc()
+            logger.info("[Controller] Returning cached result for key=%s", key)
+            value = cached if raw else json.loads(cached)
+            if not stale:
+                local_cache.set(key, value, len(cached))
+            return value, stale
+        cache_tier_misses_total.labels(tier="l2", endpoint=endpoint).inc()
+        return None, False
+
+    @staticmethod
+    async def _acquire_lock(key: str) -> str | None:
+        token = uuid.uuid4().hex
+        cache = get_redis_client()
+        acquired = await cache.set(f"lock:{key}", token, nx=True, px=int(settings.CACHE_LOCK_TTL * 1000))
+        return token if acquired else None
+
+    @staticmethod
+    async def _release_lock(key: str, token: str):
+        try:
+            cache = get_redis_client()
+            await cache.eval(PhonebookController.RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+        except Exception as e:
+            logger.warning("[Controller] Could not release cache lock for key=%s, it will expire on its own: %s", key, e)
 
     @staticmethod
-    async def list_contacts(db: AsyncSession, skip: int = 0, limit: int = settings.PAGINATION_DEFAULT_PAGE) -> list[ContactOut]:
-        logger.debug(f"[Controller] Listing contacts: skip={skip}, limit={limit}")
+    async def _load_with_lock(db: AsyncSession, key: str, endpoint: str, loader):
+        if not await PhonebookController._may_cache(db):
+            # This result will not be written to Redis, so other workers gain nothing from waiting on it.
+            return await loader(db)
+        token = await PhonebookController._acquire_lock(key)
+        if token is None:
+            # Another worker is loading this key; wait for its result, or for it to give up the lock.
+            cache_lock_contention_total.labels(endpoint=endpoint).inc()
+            cache = get_redis_client()
+            deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+                with cache_operation_duration_seconds.labels(operation="get").time():
+                    async with cache.pipeline(transaction=False) as pipe:
+                        pipe.get(key)
+                        pipe.exists(f"lock:{key}")
+                        cached, locked = await pipe.execute()
+                if cached:
+                    local_cache.set(key, cached, len(cached))
+                    return cached
+                if not locked:
+                    break
         try:
-            key = f"contacts:list:{skip}:{limit}"
+            return await loader(db)
+        finally:
+            if token is not None:
+                await PhonebookController._release_lock(key, token)
 
-            cached_result = PhonebookController._try_fetch_from_cache(key, "/contacts")
-            if cached_result is not None:
-                return cached_result
+    @staticmethod
+    async def _refresh_stale(key: str, endpoint: str, loader):
+        token = await PhonebookController._acquire_lock(key)
+        if token is None:
+            cache_lock_contention_total.labels(endpoint=endpoint).inc()
+            return
+        try:
+            factory = pick_read_session_factory()
+            async with factory() as db:
+                db.info["replica"] = factory is not AsyncSessionFactory
+                await loader(db)
+        except Exception as e:
+            logger.warning("[Controller] Background refresh failed for key=%s: %s", key, e)
+        finally:
+            await PhonebookController._release_lock(key, token)
+
+    @staticmethod
+    async def _cached_fetch(db: AsyncSession, key: str, endpoint: str, loader) -> str:
+        """Serve the raw cached string for ``key``, coalescing concurrent misses into one ``loader(db)`` call.
+
+        Within a worker, concurrent misses share one task. Across workers, a short Redis lock
+        lets one worker load while the rest wait for its result. Entries past CACHE_TTL
+        are served stale while a single background task refreshes them.
+        """
+        value, stale = await PhonebookController._try_fetch_from_cache(key, endpoint, track_staleness=True, raw=True)
+        if value is not None:
+            if stale:
+                cache_stale_served_total.labels(endpoint=endpoint).inc()
+                if key not in PhonebookController._refreshing:
+                    task = asyncio.create_task(PhonebookController._refresh_stale(key, endpoint, loader))
+                    PhonebookController._refreshing[key] = task
+                    task.add_done_callback(lambda _: PhonebookController._refreshing.pop(key, None))
+            return value
 
-            results = await ContactsDBService.get_contacts(db, skip, limit)
-            serialized = [ContactOut.model_validate(r).model_dump() for r in results]
-            contacts_total.set(len(serialized))
+        # Primary and replica loads are kept apart so a read-your-writes request never gets a replica result.
+        flight = (key, bool(db.info.get("replica")))
+        task = PhonebookController._inflight.get(flight)
+        if task is not None:
+            cache_coalesced_waits_total.labels(endpoint=endpoint).inc()
+        else:
+            task = asyncio.create_task(PhonebookController._load_with_lock(db, key, endpoint, loader))
+            PhonebookController._inflight[flight] = task
+            task.add_done_callback(lambda _: PhonebookController._inflight.pop(flight, None))
+        return await asyncio.shield(task)
 
-            PhonebookController._set_cache(key, json.dumps(serialized))
-            return serialized
+    @staticmethod
+    async def _store_contact_stats(total: int, exact: bool) -> dict:
+        stats = {"total": total, "exact": exact, "reconciled_at": time.time()}
+        cache = get_redis_client()
+        await cache.hset(
+            PhonebookController.CONTACT_STATS_KEY,
+            mapping={"total": total, "exact": int(exact), "reconciled_at": stats["reconciled_at"]}
+        )
+        local_cache.set(PhonebookController.CONTACT_STATS_KEY, stats)
+        contacts_total.set(total)
+        return stats
+
+    @staticmethod
+    async def _adjust_contact_count(delta: int):
+        try:
+            cache = get_redis_client()
+            total = await cache.eval(PhonebookController.ADJUST_COUNT_SCRIPT, 1, PhonebookController.CONTACT_STATS_KEY, delta)
+            if total is not None:
+                contacts_total.set(total)
+        except Exception as e:
+            # The next reconciliation repairs the count, so a failed adjustment must not fail the write.
+            logger.warning("[Controller] Could not adjust contact count by %s: %s", delta, e)
+
+    @staticmethod
+    async def reconcile_contact_count() -> dict:
+        async with AsyncSessionFactory() as db:
+            total, exact = await ContactsDBService.count_contacts(db)
+        cache = get_redis_client()
+        previous = await cache.hget(PhonebookController.CONTACT_STATS_KEY, "total")
+        if previous is not None and int(previous) != total:
+            logger.info("[Controller] Contact count drifted from %s to %s, reconciled", previous, total)
+        return await PhonebookController._store_contact_stats(total, exact)
+
+    @staticmethod
+    async def reconcile_contact_count_periodically():
+        while True:
+            await asyncio.sleep(settings.CONTACT_COUNT_RECONCILE_INTERVAL)
+            try:
+                await PhonebookController.reconcile_contact_count()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[Controller] Contact count reconciliation failed: %s", e)
+
+    @staticmethod
+    async def get_contact_stats() -> dict:
+        """Maintained contact count: adjusted on every write and periodically reconciled against the table."""
+        stats = local_cache.get(PhonebookController.CONTACT_STATS_KEY)
+        if stats is not None:
+            return stats
+        try:
+            cache = get_redis_client()
+            cached = await cache.hgetall(PhonebookController.CONTACT_STATS_KEY)
+            if not cached:
+                return await PhonebookController.reconcile_contact_count()
+            stats = {
+                "total": int(cached["total"]),
+                "exact": cached.get("exact") == "1",
+                "reconciled_at": float(cached["reconciled_at"]) if "reconciled_at" in cached else None,
+            }
+            local_cache.set(PhonebookController.CONTACT_STATS_KEY, stats)
+            contacts_total.set(stats["total"])
+            return stats
         except Exception as e:
-            logger.exception(f"[Controller] Failed to list contacts: {e}")
+            logger.exception("[Controller] Failed to read contact stats: %s", e)
+            raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contact stats")
+
+    @staticmethod
+    def _contact_key(contact_id: int) -> str:
+        return f"contact:{contact_id}"
+
+    @staticmethod
+    def _phone_key(number: str) -> str:
+        return f"contact:phone:{number}"
+
+    @staticmethod
+    async def _cache_contacts(contacts: list[dict]):
+        cache = get_redis_client()
+        with cache_operation_duration_seconds.labels(operation="set").time():
+            async with cache.pipeline(transaction=False) as pipe:
+                for contact in contacts:
+                    pipe.set(PhonebookController._contact_key(contact["id"]), json.dumps(contact), ex=settings.CONTACT_CACHE_TTL)
+                await pipe.execute()
+
+    @staticmethod
+    async def _fill_cache(entries: dict[str, object], generation: int, expire: int) -> bool:
+        """Cache values read from the database, unless a write has moved past ``generation`` since they were read.
+
+        Keys are set with NX so a fill never overwrites a value written through by an update.
+        """
+        encoded = {key: json.dumps(value) for key, value in entries.items()}
+        cache = get_redis_client()
+        with cache_operation_duration_seconds.labels(operation="set").time():
+            filled = await cache.eval(
+                PhonebookController.FILL_SCRIPT, len(encoded) + 1, PhonebookController.CACHE_GENERATION_KEY, *encoded,
+                generation, expire, *encoded.values()
+            )
+        # Invalidations move the local generation before they evict local entries, so the same check keeps L1 clean.
+        if filled and local_cache.get(PhonebookController.CACHE_GENERATION_KEY) == generation:
+            for key, value in entries.items():
+                local_cache.set(key, value, len(encoded[key]))
+        return bool(filled)
+
+    @staticmethod
+    async def _evict_contacts(contact_ids: list[int]):
+        if contact_ids:
+            cache = get_redis_client()
+            await cache.delete(*[PhonebookController._contact_key(i) for i in contact_ids])
+
+    @staticmethod
+    async def _evict_all_contacts():
+        cache = get_redis_client()
+        batch = []
+        async for key in cache.scan_iter(match="contact:*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                await cache.unlink(*batch)
+                batch = []
+        if batch:
+            await cache.unlink(*batch)
+
+    @staticmethod
+    def _encode_cursor(sort: str, contact) -> str:
+        values = [getattr(contact, name) for name in ContactsDBService.SORT_KEYS[sort]]
+        raw = json.dumps([sort, values], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(sort: str, cursor: str) -> list:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_sort, values = json.loads(raw)
+        except (ValueError, TypeError):
+            raise InvalidCursor("Invalid cursor")
+        keys = ContactsDBService.SORT_KEYS[sort]
+        if cursor_sort != sort or not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursor(f"Cursor does not match sort '{sort}'")
+        if not isinstance(values[-1], int):
+            raise InvalidCursor("Invalid cursor")
+        return values
+
+    @staticmethod
+    def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+        """Validate a ``?fields=`` list and return it in canonical column order, or ``None`` for every field."""
+        requested = {name.strip() for name in (fields or "").split(",") if name.strip()}
+        if not requested:
+            return None
+        unknown = requested.difference(ContactsDBService.FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(ContactsDBService.FIELDS)}"
+            )
+        projected = tuple(name for name in ContactsDBService.FIELDS if name in requested)
+        return None if projected == ContactsDBService.FIELDS else projected
+
+    @staticmethod
+    def _fields_key(fields: tuple[str, ...] | None) -> str:
+        return ",".join(fields) if fields else "*"
+
+    @staticmethod
+    def _encode_contacts(results, endpoint: str, fields: tuple[str, ...] | None = None) -> str:
+        with serialization_duration_seconds.labels(endpoint=endpoint).time():
+            if fields:
+                rows = [{name: getattr(row, name) for name in fields} for row in results]
+                return json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+            return contact_list_adapter.dump_json(
+                contact_list_adapter.validate_python(results, from_attributes=True)
+            ).decode()
+
+    @staticmethod
+    def _etag(body: str) -> str:
+        return '"' + hashlib.blake2b(body.encode(), digest_size=16).hexdigest() + '"'
+
+    @staticmethod
+    def contact_etag(contact: dict) -> str:
+        return PhonebookController._etag(json.dumps(contact, sort_keys=True, separators=(",", ":")))
+
+    @staticmethod
+    def _pack_page(body: str, next_cursor: str | None = None) -> str:
+        # ETags and cursors never contain newlines, so the first two always delimit them from the JSON body.
+        return f"{PhonebookController._etag(body)}\n{next_cursor or ''}\n{body}"
+
+    @staticmethod
+    def _unpack_page(value: str) -> dict:
+        etag, next_cursor, body = value.split("\n", 2)
+        return {"body": body, "next_cursor": next_cursor or None, "etag": etag}
+
+    @staticmethod
+    async def list_contacts(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = settings.PAGINATION_DEFAULT_PAGE,
+        cursor: str | None = None,
+        sort: str = "id",
+        fields: str | None = None
+    ) -> dict:
+        logger.debug("[Controller] Listing contacts: skip=%s, limit=%s, cursor=%s, sort=%s, fields=%s", skip, limit, cursor, sort, fields)
+        projection = PhonebookController.parse_fields(fields)
+        try:
+            after = PhonebookController._decode_cursor(sort, cursor) if cursor else None
+            position = f"c:{cursor}" if cursor else f"o:{skip}"
+            generation = await PhonebookController._get_generation()
+            key = f"contacts:list:{generation}:{PhonebookController._fields_key(projection)}:{sort}:{position}:{limit}"
+
+            async def load(session: AsyncSession) -> str:
+                results = await ContactsDBService.get_contacts(session, skip, limit, sort, after, projection)
+                next_cursor = None
+                if results and len(results) == limit:
+                    next_cursor = PhonebookController._encode_cursor(sort, results[-1])
+                body = PhonebookController._encode_contacts(results, "/contacts", projection)
+                page = PhonebookController._pack_page(body, next_cursor)
+
+                if await PhonebookController._may_cache(session):
+                    await PhonebookController._set_cache(key, page, local_value=page)
+                return page
+
+            page = await PhonebookController._cached_fetch(db, key, "/contacts", load)
+            return PhonebookController._unpack_page(page)
+        except InvalidCursor as e:
+            logger.warning("[Controller] Invalid pagination parameters: %s", e)
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.exception("[Controller] Failed to list contacts: %s", e)
             raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contacts")
 
     @staticmethod
-    async def get_contact(db: AsyncSession, contact_id: int) -> ContactOut:
-        logger.debug(f"[Controller] Getting contact id={contact_id}")
+    async def get_contact(db: AsyncSession, contact_id: int, fields: str | None = None) -> ContactOut:
+        logger.debug("[Controller] Getting contact id=%s, fields=%s", contact_id, fields)
+        projection = PhonebookController.parse_fields(fields)
+        try:
+            contact = await PhonebookController._load_contact(db, contact_id)
+            if contact is None or projection is None:
+                return contact
+            return {name: contact[name] for name in projection}
+        except Exception as e:
+            logger.exception("[Controller] Failed to get contact id=%s: %s", contact_id, e)
+            raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contact")
+
+    @staticmethod
+    async def _load_contact(db: AsyncSession, contact_id: int) -> dict | None:
+        # One cache entry per contact serves every projection, so sparse reads are cut from the full row.
+        key = PhonebookController._contact_key(contact_id)
+        cached_result, _ = await PhonebookController._try_fetch_from_cache(key, "/contacts/{contact_id}")
+        if cached_result is not None:
+            return cached_result
+
+        generation = await PhonebookController._get_generation()
+        result = await ContactsDBService.get_contact(db, contact_id)
+        if result is None:
+            return None
+        with serialization_duration_seconds.labels(endpoint="/contacts/{contact_id}").time():
+            serialized = ContactOut.model_validate(result).model_dump()
+        if await PhonebookController._may_cache(db):
+            await PhonebookController._fill_cache({key: serialized}, generation, settings.CONTACT_CACHE_TTL)
+        return serialized
+
+    @staticmethod
+    async def get_contact_by_phone(db: AsyncSession, number: str) -> dict | None:
+        logger.debug("[Controller] Reverse lookup for number=%s", number)
+        normalized = to_e164(number)
+        if normalized is None:
+            return None
         try:
-            return await ContactsDBService.get_contact(db, contact_id)
+            key = PhonebookController._phone_key(normalized)
+            cached_result, _ = await PhonebookController._try_fetch_from_cache(key, "/contacts/by-phone/{number}")
+            if cached_result is not None:
+                # Unknown numbers are cached as {} so repeated caller-ID misses skip the database too.
+                return cached_result or None
+
+            generation = await PhonebookController._get_generation()
+            result = await ContactsDBService.get_contact_by_phone(db, normalized)
+            serialized = ContactOut.model_validate(result).model_dump() if result is not None else {}
+            if await PhonebookController._may_cache(db):
+                ttl = settings.PHONE_CACHE_TTL if serialized else settings.PHONE_NEGATIVE_CACHE_TTL
+                await PhonebookController._fill_cache({key: serialized}, generation, ttl)
+            return serialized or None
         except Exception as e:
-            logger.exception(f"[Controller] Failed to get contact id={contact_id}: {e}")
+            logger.exception("[Controller] Failed reverse lookup for number=%s: %s", number, e)
             raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contact")
 
+    @staticmethod
+    async def get_contacts_batch(db: AsyncSession, contact_ids: list[int]) -> ContactBatchResult:
+        contact_ids = list(dict.fromkeys(contact_ids))
+        logger.debug("[Controller] Batch get for %s contacts", len(contact_ids))
+        if len(contact_ids) > settings.BATCH_GET_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_GET_MAX_IDS} ids can be requested at once")
+        try:
+            endpoint = "/contacts/batch-get"
+            cache_requests_total.labels(endpoint=endpoint).inc(len(contact_ids))
+            found = {}
+            for contact_id in contact_ids:
+                value = local_cache.get(PhonebookController._contact_key(contact_id))
+                if value is not None:
+                    found[contact_id] = value
+            cache_tier_hits_total.labels(tier="l1", endpoint=endpoint).inc(len(found))
+            remote = [i for i in contact_ids if i not in found]
+            cache_tier_misses_total.labels(tier="l1", endpoint=endpoint).inc(len(remote))
+            if remote:
+                cache = get_redis_client()
+                with cache_operation_duration_seconds.labels(operation="mget").time():
+                    cached = await cache.mget([PhonebookController._contact_key(i) for i in remote])
+                remote_hits = 0
+                for contact_id, value in zip(remote, cached):
+                    if value:
+                        found[contact_id] = json.loads(value)
+                        local_cache.set(PhonebookController._contact_key(contact_id), found[contact_id], len(value))
+                        remote_hits += 1
+                cache_tier_hits_total.labels(tier="l2", endpoint=endpoint).inc(remote_hits)
+                cache_tier_misses_total.labels(tier="l2", endpoint=endpoint).inc(len(remote) - remote_hits)
+            cache_hits_total.labels(endpoint=endpoint).inc(len(found))
+
+            misses = [i for i in contact_ids if i not in found]
+            if misses:
+                generation = await PhonebookController._get_generation()
+                results = await ContactsDBService.get_contacts_by_ids(db, misses)
+                with serialization_duration_seconds.labels(endpoint=endpoint).time():
+                    serialized = [ContactOut.model_validate(r).model_dump() for r in results]
+                for contact in serialized:
+                    found[contact["id"]] = contact
+                if serialized and await PhonebookController._may_cache(db):
+                    await PhonebookController._fill_cache(
+                        {PhonebookController._contact_key(c["id"]): c for c in serialized}, generation, settings.CONTACT_CACHE_TTL
+                    )
+
+            return ContactBatchResult(
+                contacts=[found[i] for i in contact_ids if i in found],
+                missing=[i for i in contact_ids if i not in found]
+            )
+        except Exception as e:
+            logger.exception("[Controller] Failed batch get for %s contacts: %s", len(contact_ids), e)
+            raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch contacts")
+
     @staticmethod
     async def create_contact(db: AsyncSession, contact: ContactCreate) -> ContactOut:
-        logger.debug(f"[Controller] Creating contact: {contact}")
+        logger.debug("[Controller] Creating contact: %s", contact)
         try:
             result = await ContactsDBService.create_contact(db, contact)
-            PhonebookController._clear_cache()
+            serialized = ContactOut.model_validate(result).model_dump()
+            await PhonebookController._after_write(
+                changed=[serialized], write_through=True, count_delta=1, created_ids=[serialized["id"]]
+            )
             return result
         except ValueError as e:
-            logger.warning(f"[Controller] Business logic error while creating contact: {e}")
+            logger.warning("[Controller] Business logic error while creating contact: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
-            logger.exception(f"[Controller] Unexpected error while creating contact: {e}")
+            logger.exception("[Controller] Unexpected error while creating contact: %s", e)
             raise HTTPException(status_code=500, detail="Internal Server Error: Could not create contact")
 
     @staticmethod
     async def update_contact(db: AsyncSession, contact_id: int, contact: ContactUpdate) -> ContactOut:
-        logger.debug(f"[Controller] Updating contact id={contact_id} with data: {contact}")
+        logger.debug("[Controller] Updating contact id=%s with data: %s", contact_id, contact)
         try:
-            result = await ContactsDBService.update_contact(db, contact_id, contact)
-            PhonebookController._clear_cache()
+            result, previous_number = await ContactsDBService.update_contact(db, contact_id, contact)
+            if result is not None:
+                serialized = ContactOut.model_validate(result).model_dump()
+                await PhonebookController._after_write(
+                    changed=[serialized], write_through=True, stale_numbers=[previous_number] if previous_number else []
+                )
             return result
         except ValueError as e:
-            logger.warning(f"[Controller] Business logic error during update: {e}")
+            logger.warning("[Controller] Business logic error during update: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
-            logger.exception(f"[Controller] Failed to update contact id={contact_id}: {e}")
+            logger.exception("[Controller] Failed to update contact id=%s: %s", contact_id, e)
             raise HTTPException(status_code=500, detail="Internal Server Error: Could not update contact")
 
     @staticmethod
     async def delete_contact(db: AsyncSession, contact_id: int) -> ContactOut:
-        logger.debug(f"[Controller] Deleting contact id={contact_id}")
+        logger.debug("[Controller] Deleting contact id=%s", contact_id)
         try:
             result = await ContactsDBService.delete_contact(db, contact_id)
-            PhonebookController._clear_cache()
+            if result is not None:
+                await PhonebookController._after_write(
+                    removed=[contact_id], count_delta=-1, stale_numbers=[result.phone_normalized] if result.phone_normalized else []
+                )
             return result
         except Exception as e:
-            logger.exception(f"[Controller] Failed to delete contact id={contact_id}: {e}")
+            logger.exception("[Controller] Failed to delete contact id=%s: %s", contact_id, e)
             raise HTTPException(status_code=500, detail="Internal Server Error: Could not delete contact")
 
     @staticmethod
-    async def search_contacts(db: AsyncSession, query: str, skip: int = 0, limit: int = settings.PAGINATION_DEFAULT_PAGE) -> list[ContactOut]:
-        logger.debug(f"[Controller] Searching contacts: query='{query}', skip={skip}, limit={limit}")
+    async def search_contacts(
+        db: AsyncSession,
+        query: str,
+        skip: int = 0,
+        limit: int = settings.PAGINATION_DEFAULT_PAGE,
+        fields: str | None = None
+    ) -> dict:
+        logger.debug("[Controller] Searching contacts: query='%s', skip=%s, limit=%s, fields=%s", query, skip, limit, fields)
+        projection = PhonebookController.parse_fields(fields)
         try:
-            key = f"search:{query}:{skip}:{limit}"
+            generation = await PhonebookController._get_generation()
+            key = f"search:{generation}:{PhonebookController._fields_key(projection)}:{query}:{skip}:{limit}"
 
-            cached_result = PhonebookController._try_fetch_from_cache(key, "/contacts/search")
-            if cached_result is not None:
-                return cached_result
+            async def load(session: AsyncSession) -> str:
+                results = await ContactsDBService.search_contacts(session, query, skip, limit, projection)
+                body = PhonebookController._encode_contacts(results, "/contacts/search", projection)
+                page = PhonebookController._pack_page(body)
 
-            results = await ContactsDBService.search_contacts(db, query, skip, limit)
-            serialized = [ContactOut.model_validate(r).model_dump() for r in results]
-            contacts_total.set(len(serialized))
+                if await PhonebookController._may_cache(session):
+                    await PhonebookController._set_cache(key, page, local_value=page)
+                return page
 
-            PhonebookController._set_cache(key, json.dumps(serialized))
-            return serialized
+            page = await PhonebookController._cached_fetch(db, key, "/contacts/search", load)
+            return PhonebookController._unpack_page(page)
         except Exception as e:
-            logger.exception(f"[Controller] Failed to search contacts: {e}")
+            logger.exception("[Controller] Failed to search contacts: %s", e)
             raise HTTPException(status_code=500, detail="Internal Server Error: Could not search contacts")
 
+    @staticmethod
+    async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        buffer = b""
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+
+    @staticmethod
+    async def _flush_bulk_batch(db: AsyncSession, batch: list[tuple[int, ContactCreate]], update_existing: bool, summary: BulkImportResult):
+        unique = {}
+        numbers = set()
+        for index, contact in batch:
+            number = to_e164(contact.phone)
+            if contact.phone in unique or (number and number in numbers):
+                summary.conflicts += 1
+                summary.rows.append(BulkRowResult(index=index, status="conflict", phone=contact.phone, detail="Duplicate phone in request"))
+            else:
+                unique[contact.phone] = (index, contact)
+                numbers.add(number)
+
+        rows, existing = await ContactsDBService.bulk_upsert_contacts(db, [c for _, c in unique.values()], update_existing)
+        written = {row["phone"] for row in rows}
+        created_before = summary.created
+        for phone, (index, contact) in unique.items():
+            if phone not in written:
+                summary.conflicts += 1
+                summary.rows.append(BulkRowResult(index=index, status="conflict", phone=phone, detail="Phone number already exists"))
+            elif phone in existing:
+                summary.updated += 1
+                summary.rows.append(BulkRowResult(index=index, status="updated", phone=phone))
+            else:
+                summary.created += 1
+        summary.batches += 1
+
+        if rows:
+            await PhonebookController._after_write(
+                changed=rows,
+                count_delta=summary.created - created_before,
+                created_ids=[row["id"] for row in rows if row["phone"] not in existing]
+            )
+        return rows
+
+    @staticmethod
+    async def bulk_create_contacts(
+        db: AsyncSession,
+        rows: AsyncIterator[dict | bytes],
+        on_conflict: str = "skip",
+        batch_size: int | None = None
+    ) -> BulkImportResult:
+        batch_size = max(1, min(batch_size or settings.BULK_BATCH_SIZE, settings.BULK_MAX_BATCH_SIZE))
+        update_existing = on_conflict == "update"
+        logger.debug("[Controller] Bulk importing contacts: on_conflict=%s, batch_size=%s", on_conflict, batch_size)
+        summary = BulkImportResult()
+        batch = []
+        try:
+            async for row in rows:
+                index = summary.received
+                summary.received += 1
+                try:
+                    if isinstance(row, bytes):
+                        contact = ContactCreate.model_validate_json(row)
+                    else:
+                        contact = ContactCreate.model_validate(row)
+                except ValidationError as e:
+                    summary.invalid += 1
+                    detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                    summary.rows.append(BulkRowResult(index=index, status="invalid", detail=detail))
+                    continue
+                batch.append((index, contact))
+                if len(batch) >= batch_size:
+                    await PhonebookController._flush_bulk_batch(db, batch, update_existing, summary)
+                    batch = []
+            if batch:
+                await PhonebookController._flush_bulk_batch(db, batch, update_existing, summary)
+            logger.info(
+                "[Controller] Bulk import finished: received=%s, created=%s, updated=%s, conflicts=%s, invalid=%s",
+                summary.received, summary.created, summary.updated, summary.conflicts, summary.invalid
+            )
+            return summary
+        except Exception as e:
+            logger.exception("[Controller] Bulk import failed after %s batches: %s", summary.batches, e)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Internal Server Error: Bulk import stopped after {summary.created + summary.updated} contacts were written"
+            )
+
+    @staticmethod
+    def _ingest_key(tracking_id: str) -> str:
+        return f"ingest:{tracking_id}"
+
+    @staticmethod
+    async def _store_ingest_statuses(statuses: list[IngestStatus], only_if_missing: bool = False):
+        cache = get_redis_client()
+        async with cache.pipeline(transaction=False) as pipe:
+            for status in statuses:
+                pipe.set(
+                    PhonebookController._ingest_key(status.tracking_id),
+                    status.model_dump_json(),
+                    ex=settings.INGEST_STATUS_TTL,
+                    nx=only_if_missing
+                )
+            await pipe.execute()
+        for status in statuses:
+            ingest_items_total.labels(status=status.status).inc()
+
+    @staticmethod
+    async def enqueue_contact(contact: ContactCreate) -> IngestStatus:
+        """Accept a create for the write-behind flusher; the result is tracked under the returned id."""
+        queue = PhonebookController._ingest_queue
+        status = IngestStatus(tracking_id=uuid.uuid4().hex, status="queued")
+        # Claim the slot before any await, so concurrent callers cannot all pass a fullness check.
+        try:
+            if not PhonebookController._ingest_accepting:
+                raise asyncio.QueueFull
+            queue.put_nowait((status.tracking_id, contact))
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Service Unavailable: ingestion queue is full",
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)}
+            )
+        ingest_queue_depth.set(queue.qsize())
+        try:
+            # NX, so a final status the flusher already wrote is never overwritten by "queued".
+            await PhonebookController._store_ingest_statuses([status], only_if_missing=True)
+        except Exception as e:
+            # The contact is queued and the flusher records its outcome, so the request still succeeds.
+            logger.warning("[Controller] Could not record queued status for %s: %s", status.tracking_id, e)
+        return status
+
+    @staticmethod
+    async def get_ingest_status(tracking_id: str) -> IngestStatus | None:
+        try:
+            cache = get_redis_client()
+            value = await cache.get(PhonebookController._ingest_key(tracking_id))
+            return IngestStatus.model_validate_json(value) if value else None
+        except Exception as e:
+            logger.exception("[Controller] Failed to read ingestion status for %s: %s", tracking_id, e)
+            raise HTTPException(status_code=500, detail="Internal Server Error: Could not fetch ingestion status")
+
+    @staticmethod
+    async def _flush_ingest_batch(items: list[tuple[str, ContactCreate]]):
+        summary = BulkImportResult()
+        try:
+            async with AsyncSessionFactory() as db:
+                rows = await PhonebookController._flush_bulk_batch(db, list(enumerate(c for _, c in items)), False, summary)
+        except Exception as e:
+            logger.exception("[Controller] Write-behind flush of %s contacts failed: %s", len(items), e)
+            statuses = [IngestStatus(tracking_id=t, status="failed", detail="Could not write contact") for t, _ in items]
+        else:
+            conflicts = {row.index: row.detail for row in summary.rows}
+            ids = {row["phone"]: row["id"] for row in rows}
+            statuses = [
+                IngestStatus(tracking_id=t, status="conflict", detail=conflicts[i]) if i in conflicts
+                else IngestStatus(tracking_id=t, status="created", contact_id=ids[c.phone])
+                for i, (t, c) in enumerate(items)
+            ]
+            logger.info("[Controller] Write-behind flush: created=%s, conflicts=%s", summary.created, summary.conflicts)
+        try:
+            await PhonebookController._store_ingest_statuses(statuses)
+        except Exception as e:
+            logger.warning("[Controller] Could not record %s ingestion statuses: %s", len(statuses), e)
+
+    @staticmethod
+    async def run_ingest_flusher():
+        """Batch queued creates into one insert when INGEST_BATCH_SIZE is reached or INGEST_FLUSH_INTERVAL elapses."""
+        queue = PhonebookController._ingest_queue
+        PhonebookController._ingest_accepting = True
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + settings.INGEST_FLUSH_INTERVAL
+            while len(batch) < settings.INGEST_BATCH_SIZE:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await PhonebookController._flush_ingest_batch(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+                ingest_queue_depth.set(queue.qsize())
+
+    @staticmethod
+    async def drain_ingest_queue(timeout: float = settings.INGEST_DRAIN_TIMEOUT):
+        PhonebookController._ingest_accepting = False
+        queue = PhonebookController._ingest_queue
+        try:
+            await asyncio.wait_for(queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("[Controller] Ingestion queue not drained after %ss, %s contacts dropped", timeout, queue.qsize())
+
+    EXPORT_COLUMNS = ("id", "first_name", "last_name", "phone", "address")
+
+    @staticmethod
+    async def export_contacts(export_format: str = "csv") -> AsyncIterator[bytes]:
+        # Runs after the handler returns, so it owns its session instead of borrowing the request one.
+        logger.debug("[Controller] Exporting contacts as %s", export_format)
+        exported = 0
+        async with pick_read_session_factory()() as db:
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(PhonebookController.EXPORT_COLUMNS)
+                yield buffer.getvalue().encode()
+            async for partition in ContactsDBService.stream_contacts(db):
+                if export_format == "csv":
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(partition)
+                    chunk = buffer.getvalue()
+                else:
+                    chunk = "".join(
+                        json.dumps(dict(zip(PhonebookController.EXPORT_COLUMNS, row))) + "\n" for row in partition
+                    )
+                exported += len(partition)
+                yield chunk.encode()
+        logger.info("[Controller] Exported %s contacts as %s", exported, export_format)
+
+    @staticmethod
+    async def autocomplete(prefix: str, limit: int = settings.PAGINATION_DEFAULT_PAGE) -> list[dict]:
+        logger.debug("[Controller] Autocomplete lookup: prefix='%s', limit=%s", prefix, limit)
+        try:
+            return autocomplete_index.lookup(prefix, limit)
+        except Exception as e:
+            logger.exception("[Controller] Failed autocomplete lookup for prefix='%s': %s", prefix, e)
+            raise HTTPException(status_code=500, detail="Internal Server Error: Could not autocomplete contacts")
+
+    @staticmethod
+    async def stream_changes(since: int | None = None) -> AsyncIterator[str]:
+        logger.debug("[Controller] Opening change feed stream since=%s", since)
+        async for message in change_feed.stream(since):
+            yield message
+
     @staticmethod
     async def delete_all_contacts(db: AsyncSession):
         logger.debug("[Controller] Deleting all contacts")
         try:
             result = await ContactsDBService.delete_all_contacts(db)
-            PhonebookController._clear_cache()
+            await PhonebookController._after_write(cleared=True)
             return result
         except Exception as e:
-            logger.exception(f"[Controller] Failed to delete all contacts: {e}")
+            logger.exception("[Controller] Failed to delete all contacts: %s", e)
             raise HTTPException(status_code=500, detail="Internal Server Error: Could not delete all contacts")
 
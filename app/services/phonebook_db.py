@@ -1,7 +1,9 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, delete
+from sqlalchemy import select, insert, update, or_, delete, tuple_, func, any_, bindparam, Integer, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from app.models.models import Contact
 from app.schemas.schemas import ContactCreate, ContactUpdate
+from app.services.phone_numbers import to_e164
 from sqlalchemy.exc import IntegrityError
 from app.core.logger import get_logger
 from app.core.config import settings
@@ -10,94 +12,279 @@ logger = get_logger("phonebook_db", settings.LOG_LEVEL)
 
 class ContactsDBService:
 
+    trigram_enabled: bool = False
+
+    SORT_KEYS = {
+        "id": ("id",),
+        "name": ("last_name", "first_name", "id"),
+    }
+
+    FIELDS = ("first_name", "last_name", "phone", "address", "id")
+
+    @staticmethod
+    def _projection(fields: tuple[str, ...] | None, required: tuple[str, ...] = ()):
+        if fields is None:
+            return select(Contact)
+        return select(*[getattr(Contact, name) for name in dict.fromkeys(fields + required)])
+
     @staticmethod
-    async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = settings.PAGINATION_DEFAULT_PAGE):
+    async def get_contacts(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = settings.PAGINATION_DEFAULT_PAGE,
+        sort: str = "id",
+        after: list | None = None,
+        fields: tuple[str, ...] | None = None
+    ):
         try:
-            logger.debug(f"[DB] Fetching contacts with skip={skip}, limit={limit}")
-            result = await db.execute(select(Contact).offset(skip).limit(limit))
-            contacts = result.scalars().all()
-            logger.info(f"[DB] Fetched {len(contacts)} contacts")
+            logger.debug("[DB] Fetching contacts with skip=%s, limit=%s, sort=%s, after=%s, fields=%s", skip, limit, sort, after, fields)
+            sort_keys = ContactsDBService.SORT_KEYS[sort]
+            sort_columns = [getattr(Contact, name) for name in sort_keys]
+            # The sort key columns are always selected so the next page cursor can be built from the last row.
+            stmt = ContactsDBService._projection(fields, sort_keys).order_by(*sort_columns).limit(limit)
+            if after is not None:
+                stmt = stmt.where(tuple_(*sort_columns) > tuple_(*after))
+            else:
+                stmt = stmt.offset(skip)
+            result = await db.execute(stmt)
+            contacts = result.scalars().all() if fields is None else result.all()
+            logger.info("[DB] Fetched %s contacts", len(contacts))
             return contacts
         except Exception as e:
-            logger.exception(f"[DB] Failed to fetch contacts: {e}")
+            logger.exception("[DB] Failed to fetch contacts: %s", e)
             raise
 
     @staticmethod
     async def get_contact(db: AsyncSession, contact_id: int):
         try:
-            logger.debug(f"[DB] Fetching contact with id={contact_id}")
+            logger.debug("[DB] Fetching contact with id=%s", contact_id)
             result = await db.execute(select(Contact).where(Contact.id == contact_id))
             contact = result.scalars().first()
             if not contact:
-                logger.warning(f"[DB] Contact not found: id={contact_id}")
+                logger.warning("[DB] Contact not found: id=%s", contact_id)
             return contact
         except Exception as e:
-            logger.exception(f"[DB] Failed to fetch contact id={contact_id}: {e}")
+            logger.exception("[DB] Failed to fetch contact id=%s: %s", contact_id, e)
             raise
 
     @staticmethod
     async def create_contact(db: AsyncSession, contact: ContactCreate):
         try:
             logger.info("[DB] Creating new contact")
-            db_contact = Contact(**contact.model_dump())
-            db.add(db_contact)
+            stmt = insert(Contact).values(**contact.model_dump(), phone_normalized=to_e164(contact.phone)).returning(Contact)
+            result = await db.execute(stmt)
+            db_contact = result.scalar_one()
             await db.commit()
-            await db.refresh(db_contact)
-            logger.info(f"[DB] Contact created successfully: id={db_contact.id}")
+            logger.info("[DB] Contact created successfully: id=%s", db_contact.id)
             return db_contact
         except IntegrityError:
-            logger.warning(f"[DB] Phone number already exists: {contact.phone}")
+            logger.warning("[DB] Phone number already exists: %s", contact.phone)
             await db.rollback()
             raise ValueError("Phone number already exists")
         except Exception as e:
-            logger.exception(f"[DB] Failed to create contact: {e}")
+            logger.exception("[DB] Failed to create contact: %s", e)
+            await db.rollback()
+            raise
+
+    @staticmethod
+    async def get_contact_by_phone(db: AsyncSession, phone_normalized: str):
+        try:
+            logger.debug("[DB] Fetching contact by phone=%s", phone_normalized)
+            result = await db.execute(select(Contact).where(Contact.phone_normalized == phone_normalized))
+            return result.scalars().first()
+        except Exception as e:
+            logger.exception("[DB] Failed to fetch contact by phone=%s: %s", phone_normalized, e)
+            raise
+
+    @staticmethod
+    async def backfill_normalized_phones(db: AsyncSession, batch_size: int = settings.BULK_BATCH_SIZE) -> int:
+        """Fill ``phone_normalized`` for rows written before the column existed; returns the rows updated."""
+        try:
+            updated = 0
+            last_id = 0
+            while True:
+                result = await db.execute(
+                    select(Contact.id, Contact.phone)
+                    .where(Contact.phone_normalized.is_(None), Contact.id > last_id)
+                    .order_by(Contact.id)
+                    .limit(batch_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                candidates = {row.id: to_e164(row.phone) for row in rows}
+                result = await db.execute(
+                    select(Contact.phone_normalized).where(Contact.phone_normalized.in_([n for n in candidates.values() if n]))
+                )
+                seen = set(result.scalars().all())
+                params = []
+                for contact_id, number in candidates.items():
+                    if number is None or number in seen:
+                        if number is not None:
+                            logger.warning("[DB] Contact id=%s duplicates normalized phone %s, left unset", contact_id, number)
+                        continue
+                    seen.add(number)
+                    params.append({"id": contact_id, "phone_normalized": number})
+                if params:
+                    await db.execute(update(Contact), params)
+                    await db.commit()
+                    updated += len(params)
+            if updated:
+                logger.info("[DB] Backfilled normalized phone for %s contacts", updated)
+            return updated
+        except Exception as e:
+            logger.exception("[DB] Failed to backfill normalized phones: %s", e)
+            await db.rollback()
+            raise
+
+    @staticmethod
+    async def get_contacts_by_ids(db: AsyncSession, contact_ids: list[int]):
+        try:
+            logger.debug("[DB] Fetching %s contacts by id", len(contact_ids))
+            if db.get_bind().dialect.name == "postgresql":
+                condition = Contact.id == any_(bindparam("contact_ids", contact_ids, type_=ARRAY(Integer)))
+            else:
+                condition = Contact.id.in_(contact_ids)
+            result = await db.execute(select(Contact).where(condition))
+            contacts = result.scalars().all()
+            logger.info("[DB] Fetched %s of %s contacts by id", len(contacts), len(contact_ids))
+            return contacts
+        except Exception as e:
+            logger.exception("[DB] Failed to fetch contacts by id: %s", e)
+            raise
+
+    @staticmethod
+    def _dialect_insert(db: AsyncSession):
+        if db.get_bind().dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        return insert(Contact)
+
+    @staticmethod
+    async def bulk_upsert_contacts(db: AsyncSession, contacts: list[ContactCreate], update_existing: bool = False):
+        try:
+            logger.debug("[DB] Bulk inserting %s contacts, update_existing=%s", len(contacts), update_existing)
+            values = [contact.model_dump() | {"phone_normalized": to_e164(contact.phone)} for contact in contacts]
+            phones = {value["phone"] for value in values}
+            normalized = [value["phone_normalized"] for value in values if value["phone_normalized"]]
+            result = await db.execute(
+                select(Contact.phone, Contact.phone_normalized)
+                .where(or_(Contact.phone.in_(list(phones)), Contact.phone_normalized.in_(normalized)))
+            )
+            owners = result.all()
+            existing = {phone for phone, _ in owners if phone in phones} if update_existing else set()
+            # A number stored under a different spelling would trip the normalized unique index; skip it as a conflict.
+            taken = {number: phone for phone, number in owners if number}
+            values = [v for v in values if taken.get(v["phone_normalized"], v["phone"]) == v["phone"]]
+            if not values:
+                return [], existing
+            stmt = ContactsDBService._dialect_insert(db).values(values)
+            if update_existing:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Contact.phone],
+                    set_={
+                        "first_name": stmt.excluded.first_name,
+                        "last_name": stmt.excluded.last_name,
+                        "address": stmt.excluded.address,
+                    }
+                )
+            else:
+                # Untargeted, so a number another request just stored in a different format is skipped too.
+                stmt = stmt.on_conflict_do_nothing()
+            stmt = stmt.returning(Contact.id, Contact.first_name, Contact.last_name, Contact.phone, Contact.address)
+            result = await db.execute(stmt)
+            rows = [row._asdict() for row in result]
+            await db.commit()
+            logger.info("[DB] Bulk insert wrote %s of %s contacts", len(rows), len(contacts))
+            return rows, existing
+        except Exception as e:
+            logger.exception("[DB] Failed to bulk insert contacts: %s", e)
             await db.rollback()
             raise
 
     @staticmethod
     async def update_contact(db: AsyncSession, contact_id: int, contact: ContactUpdate):
+        """Return ``(contact, previous_phone_normalized)``; the previous number is only read when the phone changes."""
         try:
-            logger.debug(f"[DB] Updating contact id={contact_id}")
-            db_contact = await ContactsDBService.get_contact(db, contact_id)
-            if not db_contact:
-                logger.warning(f"[DB] Contact to update not found: id={contact_id}")
-                return None
-            for field, value in contact.model_dump(exclude_unset=True).items():
-                setattr(db_contact, field, value)
+            logger.debug("[DB] Updating contact id=%s", contact_id)
+            values = contact.model_dump(exclude_unset=True)
+            if not values:
+                return await ContactsDBService.get_contact(db, contact_id), None
+            previous_number = None
+            if "phone" in values:
+                values["phone_normalized"] = to_e164(values["phone"])
+            if "phone" in values and db.get_bind().dialect.name == "postgresql":
+                # Read the number being replaced in the same statement, from the row the UPDATE locks.
+                previous = (
+                    select(Contact.id, Contact.phone_normalized)
+                    .where(Contact.id == contact_id)
+                    .with_for_update()
+                    .subquery("previous")
+                )
+                stmt = (
+                    update(Contact)
+                    .where(Contact.id == previous.c.id)
+                    .values(**values)
+                    .returning(Contact, previous.c.phone_normalized.label("previous_phone_normalized"))
+                )
+            else:
+                if "phone" in values:
+                    # SQLite's RETURNING cannot read other FROM items; it has a single writer anyway.
+                    result = await db.execute(select(Contact.phone_normalized).where(Contact.id == contact_id))
+                    previous_number = result.scalar()
+                stmt = update(Contact).where(Contact.id == contact_id).values(**values).returning(Contact)
+            result = await db.execute(stmt.execution_options(synchronize_session=False))
+            row = result.one_or_none()
             await db.commit()
-            await db.refresh(db_contact)
-            logger.info(f"[DB] Contact updated successfully: id={contact_id}")
-            return db_contact
+            if not row:
+                logger.warning("[DB] Contact to update not found: id=%s", contact_id)
+                return None, None
+            logger.info("[DB] Contact updated successfully: id=%s", contact_id)
+            return row[0], row[1] if len(row) > 1 else previous_number
         except IntegrityError:
-            logger.warning(f"[DB] Phone number already exists during update: {contact.phone}")
+            logger.warning("[DB] Phone number already exists during update: %s", contact.phone)
             await db.rollback()
             raise ValueError("Phone number already exists")
         except Exception as e:
-            logger.exception(f"[DB] Failed to update contact id={contact_id}: {e}")
+            logger.exception("[DB] Failed to update contact id=%s: %s", contact_id, e)
             raise
 
     @staticmethod
     async def delete_contact(db: AsyncSession, contact_id: int):
         try:
-            logger.debug(f"[DB] Deleting contact id={contact_id}")
-            db_contact = await ContactsDBService.get_contact(db, contact_id)
+            logger.debug("[DB] Deleting contact id=%s", contact_id)
+            stmt = (
+                delete(Contact)
+                .where(Contact.id == contact_id)
+                .returning(Contact)
+                .execution_options(synchronize_session=False)
+            )
+            result = await db.execute(stmt)
+            db_contact = result.scalar_one_or_none()
+            await db.commit()
             if not db_contact:
-                logger.warning(f"[DB] Contact to delete not found: id={contact_id}")
+                logger.warning("[DB] Contact to delete not found: id=%s", contact_id)
                 return None
-            await db.delete(db_contact)
-            await db.commit()
-            logger.info(f"[DB] Contact deleted successfully: id={contact_id}")
+            logger.info("[DB] Contact deleted successfully: id=%s", contact_id)
             return db_contact
         except Exception as e:
-            logger.exception(f"[DB] Failed to delete contact id={contact_id}: {e}")
+            logger.exception("[DB] Failed to delete contact id=%s: %s", contact_id, e)
             raise
 
     @staticmethod
-    async def search_contacts(db: AsyncSession, query: str, skip: int = 0, limit: int = settings.PAGINATION_DEFAULT_PAGE):
+    async def search_contacts(
+        db: AsyncSession,
+        query: str,
+        skip: int = 0,
+        limit: int = settings.PAGINATION_DEFAULT_PAGE,
+        fields: tuple[str, ...] | None = None
+    ):
         try:
-            logger.debug(f"[DB] Searching contacts with query='{query}', skip={skip}, limit={limit}")
+            logger.debug("[DB] Searching contacts with query='%s', skip=%s, limit=%s, fields=%s", query, skip, limit, fields)
             stmt = (
-                select(Contact)
+                ContactsDBService._projection(fields)
                 .where(
                     or_(
                         Contact.first_name.ilike(f"%{query}%"),
@@ -105,16 +292,72 @@ class ContactsDBService:
                         Contact.phone.ilike(f"%{query}%"),
                     )
                 )
-                .order_by(Contact.first_name)
                 .offset(skip)
                 .limit(limit)
             )
+            if ContactsDBService.trigram_enabled:
+                rank = func.greatest(
+                    func.similarity(Contact.first_name, query),
+                    func.similarity(Contact.last_name, query),
+                    func.similarity(Contact.phone, query),
+                )
+                stmt = stmt.order_by(rank.desc(), Contact.first_name, Contact.id)
+            else:
+                stmt = stmt.order_by(Contact.first_name, Contact.id)
             result = await db.execute(stmt)
-            results = result.scalars().all()
-            logger.info(f"[DB] Found {len(results)} contacts matching query='{query}'")
+            results = result.scalars().all() if fields is None else result.all()
+            logger.info("[DB] Found %s contacts matching query='%s'", len(results), query)
             return results
         except Exception as e:
-            logger.exception(f"[DB] Failed to search contacts with query='{query}': {e}")
+            logger.exception("[DB] Failed to search contacts with query='%s': %s", query, e)
+            raise
+
+    @staticmethod
+    async def stream_contacts(db: AsyncSession, batch_size: int = settings.EXPORT_BATCH_SIZE):
+        try:
+            logger.debug("[DB] Streaming contacts with batch_size=%s", batch_size)
+            stmt = (
+                select(Contact.id, Contact.first_name, Contact.last_name, Contact.phone, Contact.address)
+                .order_by(Contact.id)
+                .execution_options(yield_per=batch_size)
+            )
+            result = await db.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        except Exception as e:
+            logger.exception("[DB] Failed to stream contacts: %s", e)
+            raise
+
+    @staticmethod
+    async def get_autocomplete_rows(db: AsyncSession):
+        try:
+            logger.debug("[DB] Loading contacts for autocomplete index")
+            stmt = select(Contact.id, Contact.first_name, Contact.last_name, Contact.phone)
+            result = await db.execute(stmt)
+            rows = [row._asdict() for row in result]
+            logger.info("[DB] Loaded %s contacts for autocomplete index", len(rows))
+            return rows
+        except Exception as e:
+            logger.exception("[DB] Failed to load contacts for autocomplete index: %s", e)
+            raise
+
+    @staticmethod
+    async def count_contacts(db: AsyncSession) -> tuple[int, bool]:
+        """Return ``(count, exact)``; large PostgreSQL tables use the planner estimate instead of ``COUNT(*)``."""
+        try:
+            if db.bind.dialect.name == "postgresql":
+                result = await db.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                    {"table": f'"{Contact.__tablename__}"'}
+                )
+                estimate = result.scalar() or 0
+                if estimate >= settings.CONTACT_COUNT_ESTIMATE_THRESHOLD:
+                    logger.debug("[DB] Using planner estimate of %s contacts", estimate)
+                    return estimate, False
+            result = await db.execute(select(func.count()).select_from(Contact))
+            return result.scalar_one(), True
+        except Exception as e:
+            logger.exception("[DB] Failed to count contacts: %s", e)
             raise
 
     @staticmethod
@@ -125,5 +368,5 @@ class ContactsDBService:
             await db.commit()
             logger.info("[DB] All contacts deleted successfully")
         except Exception as e:
-            logger.exception(f"[DB] Failed to delete all contacts: {e}")
+            logger.exception("[DB] Failed to delete all contacts: %s", e)
             raise
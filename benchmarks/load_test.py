@@ -0,0 +1,194 @@
+"""In-process load test for the phonebook API.
+
+Runs the FastAPI app through httpx's ASGI transport against a throwaway sqlite
+database and an in-memory fakeredis server (pass ``--database-url`` /
+``--redis-url`` to target real services), seeds ``--contacts`` rows and drives
+list, search, get, create, bulk and write-behind ingest scenarios with ``--concurrency`` clients.
+p50/p95/p99 latency and requests/sec per scenario are printed and written to
+``--output`` so runs can be diffed across commits. SQLite allows a single
+writer, so create and bulk run with one client when it is the backend.
+
+    python -m benchmarks.load_test --contacts 5000 --requests 2000 --concurrency 16
+    python -m benchmarks.load_test --output bench/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+SCENARIOS = ("list", "search", "get", "create", "bulk", "ingest")
+WRITE_SCENARIOS = ("create", "bulk")
+BASE_PATH = "/phonebook/contacts"
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+PHONE_RANGES = {"Seed": "2", "Create": "3", "Bulk": "4", "Ingest": "5"}
+
+
+def make_contact(i: int, prefix: str = "Seed") -> dict:
+    return {
+        "first_name": f"{prefix}{i % 997}",
+        "last_name": f"Last{i}",
+        "phone": f"+1{PHONE_RANGES[prefix]}{i:09d}",
+        "address": f"{i} Main St",
+    }
+
+
+def summarize(samples: list[float], errors: int, elapsed: float) -> dict:
+    if len(samples) > 1:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = samples[0] if samples else 0.0
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "mean_ms": round(statistics.fmean(samples), 3) if samples else 0.0,
+        "requests_per_sec": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run_scenario(client, make_request, total: int, concurrency: int, offset: int = 0) -> dict:
+    samples: list[float] = []
+    errors = 0
+    counter = iter(range(offset, offset + total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = make_request(i)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+def request_factories(contact_ids: list[int], page_size: int, bulk_size: int, rng: random.Random) -> dict:
+    pages = max(1, len(contact_ids) // page_size)
+    # Seed names cycle through Seed0..Seed996, so smaller data sets only have the first len(contact_ids) of them.
+    names = max(1, min(997, len(contact_ids)))
+    return {
+        "list": lambda i: ("GET", BASE_PATH, {"params": {"skip": rng.randrange(pages) * page_size, "limit": page_size}}),
+        "search": lambda i: ("GET", f"{BASE_PATH}/search", {"params": {"query": f"Seed{rng.randrange(names)}"}}),
+        "get": lambda i: ("GET", f"{BASE_PATH}/{rng.choice(contact_ids)}", {}),
+        "create": lambda i: ("POST", BASE_PATH, {"json": make_contact(i, "Create")}),
+        "ingest": lambda i: ("POST", BASE_PATH, {"params": {"mode": "async"}, "json": make_contact(i, "Ingest")}),
+        "bulk": lambda i: ("POST", f"{BASE_PATH}/bulk", {
+            "json": [make_contact(i * bulk_size + j, "Bulk") for j in range(bulk_size)]
+        }),
+    }
+
+
+async def main(args):
+    tmpdir = None
+    if args.database_url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database_url = f"sqlite+aiosqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Every simulated client shares one address, so the per-client rate limit would cap the whole run.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    import httpx
+    import redis.asyncio as redis
+    from app.dependencies import redis as redis_dependency
+    from app.dependencies.database import AsyncSessionFactory, create_tables, async_engine
+    from app.core.events import on_startup, on_shutdown
+    from app.main import app
+    from app.schemas.schemas import ContactCreate
+    from app.services.phonebook_db import ContactsDBService
+
+    if args.redis_url:
+        redis_dependency._redis_client = redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis
+        redis_dependency._redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await redis_dependency._redis_client.flushdb()
+
+    await create_tables(async_engine)
+    async with AsyncSessionFactory() as db:
+        await ContactsDBService.delete_all_contacts(db)
+        for offset in range(0, args.contacts, 1000):
+            batch = [ContactCreate(**make_contact(i)) for i in range(offset, min(offset + 1000, args.contacts))]
+            await ContactsDBService.bulk_upsert_contacts(db, batch, update_existing=False)
+        contact_ids = [row["id"] for row in await ContactsDBService.get_autocomplete_rows(db)]
+    await on_startup()
+    sqlite = args.database_url.startswith("sqlite")
+
+    rng = random.Random(args.seed)
+    factories = request_factories(contact_ids, args.page_size, args.bulk_size, rng)
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios:
+                total = max(1, args.requests // args.bulk_size) if name == "bulk" else args.requests
+                concurrency = 1 if sqlite and name in WRITE_SCENARIOS else args.concurrency
+                await run_scenario(client, factories[name], min(args.warmup, total), concurrency, offset=total)
+                results[name] = await run_scenario(client, factories[name], total, concurrency)
+                results[name]["concurrency"] = concurrency
+    finally:
+        await on_shutdown()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "database": args.database_url.split("://", 1)[0],
+        "redis": "redis" if args.redis_url else "fakeredis",
+        "contacts": args.contacts,
+        "concurrency": args.concurrency,
+        "scenarios": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{args.contacts} contacts, concurrency {args.concurrency}, latency in ms")
+    print(f"{'scenario':<10}{'requests':>10}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<10}{r['requests']:>10}{r['errors']:>8}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+            f"{r['p99_ms']:>10.2f}{r['requests_per_sec']:>10.1f}"
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Defaults to a throwaway sqlite database")
+    parser.add_argument("--redis-url", default=None, help="Defaults to an in-memory fakeredis server")
+    parser.add_argument("--contacts", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario; bulk sends requests / bulk-size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--bulk-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--output", default="bench_results.json")
+    asyncio.run(main(parser.parse_args()))
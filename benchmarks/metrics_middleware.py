@@ -0,0 +1,82 @@
+"""Per-request overhead of the metrics middleware.
+
+Serves a trivial route through httpx's ASGI transport with no middleware, the
+previous ``BaseHTTPMiddleware`` implementation (raw path labels, ``time.time``)
+and the current pure ASGI ``PrometheusMiddleware``, and reports the p50 cost
+each adds over the bare app.
+
+    python -m benchmarks.metrics_middleware --iterations 5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from fastapi import FastAPI, Request
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.metrics import PrometheusMiddleware
+
+legacy_registry = CollectorRegistry()
+legacy_requests_total = Counter("http_requests_total", "", ["method", "endpoint"], registry=legacy_registry)
+legacy_request_duration_seconds = Histogram("http_request_duration_seconds", "", ["endpoint"], registry=legacy_registry)
+
+
+class LegacyPrometheusMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        duration = time.time() - start_time
+        endpoint = request.url.path
+        legacy_requests_total.labels(method=request.method, endpoint=endpoint).inc()
+        legacy_request_duration_seconds.labels(endpoint=endpoint).observe(duration)
+        return response
+
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/contacts/{contact_id}")
+    async def read_contact(contact_id: int):
+        return {"id": contact_id}
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def time_requests(app: FastAPI, iterations: int) -> list[float]:
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(200):
+            await client.get(f"/contacts/{i}")
+        for i in range(iterations):
+            start = time.perf_counter()
+            response = await client.get(f"/contacts/{i}")
+            samples.append((time.perf_counter() - start) * 1e6)
+            assert response.status_code == 200
+    return samples
+
+
+async def main(iterations: int):
+    variants = {
+        "none": build_app(),
+        "legacy": build_app(LegacyPrometheusMiddleware),
+        "asgi": build_app(PrometheusMiddleware),
+    }
+    p50 = {name: statistics.median(await time_requests(app, iterations)) for name, app in variants.items()}
+
+    print(f"{iterations} requests per variant, p50 in microseconds")
+    print(f"{'middleware':<12}{'p50 us':>10}{'overhead us':>14}")
+    for name, value in p50.items():
+        print(f"{name:<12}{value:>10.1f}{value - p50['none']:>14.1f}")
+    paths = {sample.labels["endpoint"] for sample in legacy_request_duration_seconds.collect()[0].samples}
+    print(f"legacy duration histogram label sets after the run: {len(paths)} (asgi: 1 route template)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=3000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,101 @@
+"""Compare list/search response encoding before and after serving raw cached bytes.
+
+Cache hit: the previous path decoded the cached JSON and let FastAPI validate it
+against ``list[ContactOut]`` and re-encode it; the current path returns the
+cached string untouched. Cache miss: per-row ``model_validate().model_dump()``
+plus ``json.dumps`` versus a single ``TypeAdapter.dump_json``.
+
+    python -m benchmarks.response_encoding --rows 10 --iterations 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+from fastapi import FastAPI, Response
+from app.models.models import Contact
+from app.schemas.schemas import ContactOut
+from app.services.phonebook_controller import contact_list_adapter
+
+
+def make_rows(count: int) -> list[Contact]:
+    return [
+        Contact(id=i, first_name=f"First{i}", last_name=f"Last{i}", phone=f"+1555{i:07d}", address=f"{i} Main St")
+        for i in range(count)
+    ]
+
+
+def encode_legacy(rows) -> str:
+    return json.dumps([ContactOut.model_validate(r).model_dump() for r in rows])
+
+
+def encode_current(rows) -> str:
+    return contact_list_adapter.dump_json(contact_list_adapter.validate_python(rows, from_attributes=True)).decode()
+
+
+def build_app(cached: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=list[ContactOut])
+    async def legacy():
+        return json.loads(cached)
+
+    @app.get("/current", response_model=list[ContactOut])
+    async def current():
+        return Response(content=cached, media_type="application/json")
+
+    return app
+
+
+def time_calls(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def time_requests(client: httpx.AsyncClient, path: str, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = await client.get(path)
+        samples.append((time.perf_counter() - start) * 1e6)
+        assert response.status_code == 200
+    return samples
+
+
+def report(name: str, legacy: list[float], current: list[float]):
+    legacy_p50, current_p50 = statistics.median(legacy), statistics.median(current)
+    print(f"{name:<12}{legacy_p50:>14.1f}{current_p50:>14.1f}{legacy_p50 / current_p50:>10.2f}x")
+
+
+async def main(rows: int, iterations: int):
+    contacts = make_rows(rows)
+    cached = encode_current(contacts)
+    assert json.loads(cached) == json.loads(encode_legacy(contacts))
+
+    miss_legacy = time_calls(lambda: encode_legacy(contacts), iterations)
+    miss_current = time_calls(lambda: encode_current(contacts), iterations)
+
+    transport = httpx.ASGITransport(app=build_app(cached))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await time_requests(client, "/legacy", 50)
+        await time_requests(client, "/current", 50)
+        hit_legacy = await time_requests(client, "/legacy", iterations)
+        hit_current = await time_requests(client, "/current", iterations)
+
+    print(f"{rows} rows per page, {iterations} iterations, p50 in microseconds")
+    print(f"{'path':<12}{'legacy us':>14}{'current us':>14}{'speedup':>11}")
+    report("miss encode", miss_legacy, miss_current)
+    report("hit request", hit_legacy, hit_current)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations))
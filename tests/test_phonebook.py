@@ -1,4 +1,10 @@
 import os
+import json
+import time
+import shutil
+import socket
+import subprocess
+import sys
 import pytest
 import requests
 import logging
@@ -146,3 +152,708 @@ def test_search_contacts_cache():
     assert resp2.status_code == 200, f"Second search_contacts failed: {resp2.text}"
     data2 = resp2.json()
     assert data1 == data2
+
+def _metric_value(metric: str, **labels) -> float:
+    metrics = requests.get(settings.HOST_URL.split("/phonebook")[0] + "/metrics/json").json()
+    samples = metrics.get(metric, {}).get("samples", [])
+    return sum(s["value"] for s in samples if s["name"].endswith("_total") and labels.items() <= s["labels"].items())
+
+def test_l1_cache_hits_on_repeat_reads():
+    logger.info("Testing that repeat reads are answered from the in-process L1 cache")
+    res = requests.post(settings.HOST_URL, json=test_contact | {"first_name": "Local", "phone": "4920000000"})
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+
+    labels = {"tier": "l1", "endpoint": "/contacts/{contact_id}"}
+    assert requests.get(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+    before = _metric_value("cache_tier_hits", **labels)
+    for _ in range(3):
+        assert requests.get(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+    assert _metric_value("cache_tier_hits", **labels) >= before + 3
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+
+def test_invalidation_from_another_worker_evicts_l1():
+    logger.info("Testing that an invalidation published by another worker evicts local entries")
+    from app.services.local_cache import local_cache
+    from app.services.phonebook_controller import PhonebookController
+
+    changed_key, removed_key, other_key = (PhonebookController._contact_key(i) for i in (9001, 9002, 9003))
+    for key in (changed_key, removed_key, other_key):
+        local_cache.set(key, {"id": key}, 10)
+    PhonebookController._apply_invalidation({
+        "origin": "another-worker",
+        "generation": 0,
+        "changed": [{"id": 9001, "first_name": "Remote", "last_name": "Writer", "phone": "4920000001"}],
+        "removed": [9002],
+        "numbers": [],
+        "cleared": False,
+    })
+    assert local_cache.get(changed_key) is None
+    assert local_cache.get(removed_key) is None
+    assert local_cache.get(other_key) is not None
+
+    PhonebookController._apply_invalidation({
+        "origin": "another-worker", "generation": 0, "changed": [], "removed": [], "numbers": [], "cleared": True
+    })
+    assert local_cache.get(other_key) is None
+
+def test_cache_invalidated_after_write():
+    logger.info("Testing cache invalidation after update")
+    contact = {
+        "first_name": "Cachey",
+        "last_name": "Invalidate",
+        "phone": "8888888888",
+        "address": "Cache Street"
+    }
+    res = requests.post(settings.HOST_URL, json=contact)
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+    first = requests.get(f"{settings.HOST_URL}/search?query=Cachey")
+    assert first.status_code == 200, f"Search failed: {first.text}"
+    update = requests.put(f"{settings.HOST_URL}/{contact_id}", json={"address": "Fresh Street"})
+    assert update.status_code == 200, f"Update failed: {update.text}"
+    second = requests.get(f"{settings.HOST_URL}/search?query=Cachey")
+    assert second.status_code == 200, f"Search after update failed: {second.text}"
+    assert second.json()[0]["address"] == "Fresh Street"
+    delete_resp = requests.delete(f"{settings.HOST_URL}/{contact_id}")
+    assert delete_resp.status_code == 200
+
+def test_list_contacts_cursor_pagination():
+    logger.info("Testing cursor pagination for list_contacts")
+    contacts = [
+        {"first_name": "Cursor", "last_name": f"Page{i}", "phone": f"90000000{i}", "address": "Cursor Road"}
+        for i in range(3)
+    ]
+    ids = []
+    for contact in contacts:
+        res = requests.post(settings.HOST_URL, json=contact)
+        assert res.status_code == 201, f"Failed to create contact: {res.text}"
+        ids.append(res.json()["id"])
+
+    seen = []
+    resp = requests.get(f"{settings.HOST_URL}?limit=2&sort=name")
+    assert resp.status_code == 200, f"First page failed: {resp.text}"
+    seen += [c["id"] for c in resp.json()]
+    while "X-Next-Cursor" in resp.headers:
+        resp = requests.get(f"{settings.HOST_URL}?limit=2&sort=name&cursor={resp.headers['X-Next-Cursor']}")
+        assert resp.status_code == 200, f"Next page failed: {resp.text}"
+        seen += [c["id"] for c in resp.json()]
+    assert len(seen) == len(set(seen))
+    assert set(ids) <= set(seen)
+
+    bad = requests.get(f"{settings.HOST_URL}?cursor=not-a-cursor")
+    assert bad.status_code == 400, f"Expected 400 for invalid cursor, got: {bad.status_code}"
+    first = requests.get(f"{settings.HOST_URL}?limit=2&sort=name")
+    mismatched = requests.get(f"{settings.HOST_URL}?limit=2&sort=id&cursor={first.headers['X-Next-Cursor']}")
+    assert mismatched.status_code == 400 and mismatched.json()["detail"] == "Cursor does not match sort 'id'"
+
+    for contact_id in ids:
+        assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+
+def test_autocomplete_contacts():
+    logger.info("Testing autocomplete by name and phone prefix")
+    contact = {
+        "first_name": "Autumn",
+        "last_name": "Completer",
+        "phone": "+1 (555) 010-2030",
+        "address": "Prefix Plaza"
+    }
+    res = requests.post(settings.HOST_URL, json=contact)
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+
+    by_name = requests.get(f"{settings.HOST_URL}/autocomplete?prefix=autu")
+    assert by_name.status_code == 200, f"Autocomplete by name failed: {by_name.text}"
+    assert contact_id in [c["id"] for c in by_name.json()]
+
+    for prefix in ("1555010", "555010", "+1 555"):
+        by_phone = requests.get(f"{settings.HOST_URL}/autocomplete", params={"prefix": prefix})
+        assert by_phone.status_code == 200, f"Autocomplete by phone failed: {by_phone.text}"
+        assert contact_id in [c["id"] for c in by_phone.json()], f"No match for prefix {prefix}"
+        assert [c["id"] for c in by_phone.json()].count(contact_id) == 1
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+    after_delete = requests.get(f"{settings.HOST_URL}/autocomplete?prefix=autu")
+    assert contact_id not in [c["id"] for c in after_delete.json()]
+
+def test_autocomplete_index_batch_updates():
+    logger.info("Testing that batched index updates match a fresh build")
+    import random
+    from app.services.autocomplete_index import AutocompleteIndex
+
+    def contact(i, version=0):
+        return {"id": i, "first_name": f"Name{(i * 7 + version) % 50}", "last_name": f"Family{i % 13}", "phone": f"555{(i * 31 + version) % 10000:07d}"}
+
+    rng = random.Random(7)
+    current = {i: contact(i) for i in range(500)}
+    index = AutocompleteIndex()
+    index.build(current.values())
+    # One-row messages take the in-place path, larger ones rebuild the lists once.
+    for size in (1, 3, 200, 1000):
+        changed = [contact(rng.randrange(600), version=size) for _ in range(size)]
+        removed = rng.sample(sorted(current), min(size, 20))
+        index.upsert_many(changed)
+        index.remove_many(removed)
+        current.update({c["id"]: c for c in changed})
+        for contact_id in removed:
+            current.pop(contact_id, None)
+
+        expected = AutocompleteIndex()
+        expected.build(current.values())
+        assert index._phones == expected._phones and index._names == expected._names
+        assert index._memory_bytes == expected._memory_bytes and len(index) == len(current)
+
+def test_bulk_create_contacts():
+    logger.info("Testing bulk import with conflicts and NDJSON")
+    contacts = [
+        {"first_name": "Bulk", "last_name": f"Row{i}", "phone": f"31000000{i}", "address": "Bulk Avenue"}
+        for i in range(5)
+    ]
+    contacts.append({"first_name": "Bulk", "last_name": "Dup", "phone": "310000000"})
+    contacts.append({"first_name": "Bulk"})
+    resp = requests.post(f"{settings.HOST_URL}/bulk?batch_size=2", json=contacts)
+    assert resp.status_code == 200, f"Bulk import failed: {resp.text}"
+    summary = resp.json()
+    assert summary["received"] == 7
+    assert summary["created"] == 5
+    assert summary["conflicts"] == 1
+    assert summary["invalid"] == 1
+    assert {row["index"] for row in summary["rows"]} == {5, 6}
+
+    ndjson = '{"first_name": "Bulky", "last_name": "Row0", "phone": "310000000"}\n'
+    resp = requests.post(
+        f"{settings.HOST_URL}/bulk?on_conflict=update",
+        data=ndjson,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert resp.status_code == 200, f"NDJSON bulk import failed: {resp.text}"
+    assert resp.json()["updated"] == 1
+
+    search = requests.get(f"{settings.HOST_URL}/search?query=Bulky")
+    assert search.status_code == 200, f"Search after bulk update failed: {search.text}"
+    for contact in requests.get(f"{settings.HOST_URL}/search?query=Bulk&limit=50").json():
+        assert requests.delete(f"{settings.HOST_URL}/{contact['id']}").status_code == 200
+
+def test_export_contacts():
+    logger.info("Testing CSV and NDJSON export")
+    res = requests.post(settings.HOST_URL, json=test_contact | {"phone": "4200000000"})
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+
+    csv_resp = requests.get(f"{settings.HOST_URL}/export?format=csv")
+    assert csv_resp.status_code == 200, f"CSV export failed: {csv_resp.text}"
+    lines = csv_resp.text.splitlines()
+    assert lines[0] == "id,first_name,last_name,phone,address"
+    assert any(line.startswith(f"{contact_id},") for line in lines[1:])
+
+    ndjson_resp = requests.get(f"{settings.HOST_URL}/export?format=ndjson")
+    assert ndjson_resp.status_code == 200, f"NDJSON export failed: {ndjson_resp.text}"
+    rows = [json.loads(line) for line in ndjson_resp.text.splitlines()]
+    assert contact_id in [row["id"] for row in rows]
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+
+def test_batch_get_contacts():
+    logger.info("Testing batch get with cached and missing ids")
+    ids = []
+    for i in range(3):
+        res = requests.post(settings.HOST_URL, json=test_contact | {"phone": f"43000000{i}"})
+        assert res.status_code == 201, f"Failed to create contact: {res.text}"
+        ids.append(res.json()["id"])
+    assert requests.get(f"{settings.HOST_URL}/{ids[0]}").status_code == 200
+
+    resp = requests.post(f"{settings.HOST_URL}/batch-get", json={"ids": ids + [999999]})
+    assert resp.status_code == 200, f"Batch get failed: {resp.text}"
+    body = resp.json()
+    assert [c["id"] for c in body["contacts"]] == ids
+    assert body["missing"] == [999999]
+
+    update = requests.put(f"{settings.HOST_URL}/{ids[0]}", json={"address": "Batch Blvd"})
+    assert update.status_code == 200, f"Update failed: {update.text}"
+    assert requests.get(f"{settings.HOST_URL}/{ids[0]}").json()["address"] == "Batch Blvd"
+
+    for contact_id in ids:
+        assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+    resp = requests.post(f"{settings.HOST_URL}/batch-get", json={"ids": ids})
+    assert resp.json()["missing"] == ids
+
+def test_conditional_get_etag():
+    logger.info("Testing ETag / If-None-Match on list, search and get")
+    res = requests.post(settings.HOST_URL, json=test_contact | {"first_name": "Etag", "phone": "4400000000"})
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+
+    for url in (f"{settings.HOST_URL}?limit=5", f"{settings.HOST_URL}/search?query=Etag", f"{settings.HOST_URL}/{contact_id}"):
+        first = requests.get(url)
+        assert first.status_code == 200, f"GET {url} failed: {first.text}"
+        etag = first.headers["ETag"]
+        second = requests.get(url, headers={"If-None-Match": etag})
+        assert second.status_code == 304, f"Expected 304 for {url}, got: {second.status_code}"
+        assert second.headers["ETag"] == etag
+
+    stale_etag = requests.get(f"{settings.HOST_URL}/{contact_id}").headers["ETag"]
+    assert requests.put(f"{settings.HOST_URL}/{contact_id}", json={"address": "Etag Ave"}).status_code == 200
+    after = requests.get(f"{settings.HOST_URL}/{contact_id}", headers={"If-None-Match": stale_etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != stale_etag
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+
+def test_layer_timing_metrics():
+    logger.info("Testing per-layer timing histograms")
+    res = requests.post(settings.HOST_URL, json=test_contact | {"first_name": "Layer", "phone": "4500000000"})
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+    assert requests.get(f"{settings.HOST_URL}/search", params={"query": "Layer"}).status_code == 200
+
+    metrics = requests.get(settings.HOST_URL.split("/phonebook")[0] + "/metrics/json").json()
+    statements = {s["labels"].get("statement") for s in metrics["db_query_duration_seconds"]["samples"]}
+    operations = {s["labels"].get("operation") for s in metrics["cache_operation_duration_seconds"]["samples"]}
+    endpoints = {s["labels"].get("endpoint") for s in metrics["serialization_duration_seconds"]["samples"]}
+    assert {"SELECT", "INSERT"} <= statements
+    assert {"get", "set"} <= operations
+    assert "/contacts/search" in endpoints
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+
+def test_request_metrics_use_route_templates():
+    logger.info("Testing request metrics labels and text exposition")
+    base_url = settings.HOST_URL.split("/phonebook")[0]
+    for contact_id in (987654321, 987654322):
+        assert requests.get(f"{settings.HOST_URL}/{contact_id}").status_code == 404
+
+    metrics = requests.get(f"{base_url}/metrics/json").json()
+    samples = metrics["http_requests"]["samples"]
+    endpoints = {s["labels"]["endpoint"] for s in samples}
+    assert "/phonebook/contacts/{contact_id}" in endpoints
+    assert not any("987654321" in endpoint for endpoint in endpoints)
+    assert any(
+        s["labels"]["endpoint"] == "/phonebook/contacts/{contact_id}" and s["labels"]["status"] == "404"
+        for s in samples
+    )
+
+    res = requests.get(f"{base_url}/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds_bucket" in res.text
+
+def test_contact_stats():
+    logger.info("Testing maintained contact count and stats endpoint")
+    before = requests.get(f"{settings.HOST_URL}/stats")
+    assert before.status_code == 200, f"Failed to fetch stats: {before.text}"
+    total = before.json()["total"]
+    assert requests.get(settings.HOST_URL).headers["X-Total-Count"] == str(total)
+
+    res = requests.post(settings.HOST_URL, json=test_contact | {"first_name": "Stats", "phone": "4600000000"})
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+    rows = [test_contact | {"phone": "4600000001"}, test_contact | {"phone": "4600000000"}]
+    assert requests.post(f"{settings.HOST_URL}/bulk", json=rows).json()["created"] == 1
+
+    stats = requests.get(f"{settings.HOST_URL}/stats").json()
+    assert stats["total"] == total + 2
+    assert stats["exact"] is True
+    assert requests.get(settings.HOST_URL).headers["X-Total-Count"] == str(total + 2)
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+    bulk_id = requests.get(f"{settings.HOST_URL}/search", params={"query": "4600000001"}).json()[0]["id"]
+    assert requests.delete(f"{settings.HOST_URL}/{bulk_id}").status_code == 200
+    assert requests.get(f"{settings.HOST_URL}/stats").json()["total"] == total
+
+def test_request_id_header():
+    logger.info("Testing correlation id propagation")
+    res = requests.get(settings.HOST_URL, headers={"X-Request-ID": "test-correlation-id"})
+    assert res.status_code == 200
+    assert res.headers["X-Request-ID"] == "test-correlation-id"
+    generated = requests.get(settings.HOST_URL).headers["X-Request-ID"]
+    assert generated and generated != "test-correlation-id"
+
+def test_reverse_lookup_by_phone():
+    logger.info("Testing exact reverse lookup on the normalized phone")
+    res = requests.post(settings.HOST_URL, json=test_contact | {"first_name": "Caller", "phone": "+1 (555) 470-0001"})
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+
+    for number in ("+15554700001", "555 470 0001", "001-555-470-0001", "15554700001", "1-555-470-0001"):
+        found = requests.get(f"{settings.HOST_URL}/by-phone/{number}")
+        assert found.status_code == 200, f"Lookup for {number} failed: {found.text}"
+        assert found.json()["id"] == contact_id
+
+    for number in ("555-470-0001", "1-555-470-0001"):
+        duplicate = requests.post(settings.HOST_URL, json=test_contact | {"phone": number})
+        assert duplicate.status_code == 400, f"Same number written as {number} should be rejected"
+
+    assert requests.get(f"{settings.HOST_URL}/by-phone/5554700002").status_code == 404
+    assert requests.put(f"{settings.HOST_URL}/{contact_id}", json={"phone": "555 470 0002"}).status_code == 200
+    assert requests.get(f"{settings.HOST_URL}/by-phone/5554700002").json()["id"] == contact_id
+    assert requests.get(f"{settings.HOST_URL}/by-phone/5554700001").status_code == 404
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+    assert requests.get(f"{settings.HOST_URL}/by-phone/5554700002").status_code == 404
+
+def test_admission_control_metrics():
+    logger.info("Testing admission control bookkeeping")
+    res = requests.get(settings.HOST_URL)
+    assert res.status_code == 200, f"Request was shed unexpectedly: {res.text}"
+
+    metrics = requests.get(settings.HOST_URL.split("/phonebook")[0] + "/metrics/json").json()
+    in_flight = {s["labels"]["route_class"]: s["value"] for s in metrics["admission_in_flight"]["samples"]}
+    assert in_flight.get("read") == 0, "Admitted requests must release their slot"
+    assert "admission_queue_depth" in metrics
+    assert "admission_shed" in metrics
+
+def test_admission_route_classes():
+    from app.core.admission import AdmissionControlMiddleware
+    route_class = AdmissionControlMiddleware.route_class
+    assert route_class("POST", "/phonebook/contacts/batch-get") == "read"
+    assert route_class("GET", "/phonebook/contacts/export") == "stream"
+    assert route_class("GET", "/phonebook/contacts/changes") == "stream"
+    assert route_class("GET", "/phonebook/contacts/search") == "search"
+    assert route_class("POST", "/phonebook/contacts/bulk") == "write"
+    assert route_class("GET", "/phonebook/contacts/7") == "read"
+
+def test_async_ingestion():
+    logger.info("Testing write-behind contact ingestion")
+    phones = ["4700000000", "4700000001", "4700000000"]
+    tracking = []
+    for phone in phones:
+        res = requests.post(settings.HOST_URL, params={"mode": "async"}, json=test_contact | {"first_name": "Ingest", "phone": phone})
+        assert res.status_code == 202, f"Failed to enqueue contact: {res.text}"
+        assert res.json()["status"] == "queued"
+        assert res.headers["Location"].endswith(f"/ingest/{res.json()['tracking_id']}")
+        tracking.append(res.json()["tracking_id"])
+
+    statuses = []
+    for _ in range(50):
+        statuses = [requests.get(f"{settings.HOST_URL}/ingest/{t}").json() for t in tracking]
+        if all(s["status"] != "queued" for s in statuses):
+            break
+        time.sleep(0.1)
+    assert [s["status"] for s in statuses] == ["created", "created", "conflict"], statuses
+
+    for status in statuses[:2]:
+        contact = requests.get(f"{settings.HOST_URL}/{status['contact_id']}")
+        assert contact.status_code == 200
+        assert contact.json()["first_name"] == "Ingest"
+        assert requests.delete(f"{settings.HOST_URL}/{status['contact_id']}").status_code == 200
+    assert requests.get(f"{settings.HOST_URL}/ingest/unknown").status_code == 404
+
+def test_sparse_fields_and_negotiation():
+    logger.info("Testing ?fields= projection and Accept / Accept-Encoding negotiation")
+    contacts = [
+        {"first_name": "Sparse", "last_name": f"Row{i}", "phone": f"48000000{i:02d}", "address": f"{i} Sparse Boulevard, Apartment {i}"}
+        for i in range(20)
+    ]
+    resp = requests.post(f"{settings.HOST_URL}/bulk", json=contacts)
+    assert resp.status_code == 200 and resp.json()["created"] == 20, f"Bulk import failed: {resp.text}"
+
+    listed = requests.get(settings.HOST_URL, params={"fields": "phone,first_name", "limit": 5})
+    assert listed.status_code == 200, f"List with fields failed: {listed.text}"
+    assert listed.json() and all(set(c) == {"first_name", "phone"} for c in listed.json())
+
+    found = requests.get(f"{settings.HOST_URL}/search", params={"query": "Sparse", "fields": "id,phone", "limit": 20}).json()
+    assert len(found) == 20 and all(set(c) == {"id", "phone"} for c in found)
+    contact_id = found[0]["id"]
+    single = requests.get(f"{settings.HOST_URL}/{contact_id}", params={"fields": "phone"})
+    assert single.json() == {"phone": found[0]["phone"]}
+    assert requests.get(f"{settings.HOST_URL}/{contact_id}", params={"fields": "ssn"}).status_code == 400
+
+    # A list with no field names in it selects every field, the same as leaving ?fields= out.
+    full = requests.get(f"{settings.HOST_URL}/{contact_id}").json()
+    for blank in (",", " ", " , "):
+        assert requests.get(f"{settings.HOST_URL}/{contact_id}", params={"fields": blank}).json() == full
+        listed = requests.get(settings.HOST_URL, params={"fields": blank, "limit": 5})
+        assert listed.status_code == 200 and all(set(c) == set(full) for c in listed.json())
+        searched = requests.get(f"{settings.HOST_URL}/search", params={"query": "Sparse", "fields": blank, "limit": 5})
+        assert searched.status_code == 200 and all(set(c) == set(full) for c in searched.json())
+
+    plain = requests.get(f"{settings.HOST_URL}/search", params={"query": "Sparse", "limit": 20}, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    gzipped = requests.get(f"{settings.HOST_URL}/search", params={"query": "Sparse", "limit": 20}, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.json() == plain.json()
+    assert gzipped.headers["ETag"] != plain.headers["ETag"]
+    assert "Accept-Encoding" in gzipped.headers["Vary"]
+
+    packed = requests.get(
+        f"{settings.HOST_URL}/search",
+        params={"query": "Sparse", "limit": 20},
+        headers={"Accept": "application/msgpack", "Accept-Encoding": "identity"}
+    )
+    assert packed.headers["Content-Type"] == "application/msgpack"
+    assert len(packed.content) < len(plain.content)
+    revalidated = requests.get(
+        f"{settings.HOST_URL}/search",
+        params={"query": "Sparse", "limit": 20},
+        headers={"Accept": "application/msgpack", "Accept-Encoding": "identity", "If-None-Match": packed.headers["ETag"]}
+    )
+    assert revalidated.status_code == 304
+
+    for contact in found:
+        assert requests.delete(f"{settings.HOST_URL}/{contact['id']}").status_code == 200
+
+def _read_events(response, count):
+    events, event = [], {}
+    for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+        if line.startswith(("id:", "event:", "data:")):
+            field, _, value = line.partition(": ")
+            event[field] = value
+        elif not line and event:
+            events.append(event)
+            event = {}
+            if len(events) == count:
+                break
+    return events
+
+def test_change_feed():
+    logger.info("Testing the SSE change feed and resuming from Last-Event-ID")
+    with requests.get(f"{settings.HOST_URL}/changes", stream=True, timeout=5) as stream:
+        assert stream.headers["Content-Type"].startswith("text/event-stream")
+        res = requests.post(settings.HOST_URL, json=test_contact | {"first_name": "Feed", "phone": "4900000000"})
+        assert res.status_code == 201, f"Failed to create contact: {res.text}"
+        contact_id = res.json()["id"]
+        assert requests.put(f"{settings.HOST_URL}/{contact_id}", json={"address": "Feed Street"}).status_code == 200
+        events = _read_events(stream, 2)
+    assert [e["event"] for e in events] == ["created", "updated"]
+    assert json.loads(events[1]["data"])["contact"]["address"] == "Feed Street"
+    assert int(events[1]["id"]) == int(events[0]["id"]) + 1
+
+    assert requests.delete(f"{settings.HOST_URL}/{contact_id}").status_code == 200
+    with requests.get(f"{settings.HOST_URL}/changes", headers={"Last-Event-ID": events[0]["id"]}, stream=True, timeout=5) as resumed:
+        replayed = _read_events(resumed, 2)
+    assert [e["event"] for e in replayed] == ["updated", "deleted"]
+    assert json.loads(replayed[1]["data"])["id"] == contact_id
+
+@pytest.fixture(scope="module")
+def replica_server(tmp_path_factory):
+    """A second app instance on sqlite whose read replica is a snapshot copy of its primary."""
+    workdir = tmp_path_factory.mktemp("replica")
+    primary, replica = workdir / "primary.db", workdir / "replica.db"
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = os.environ | {
+        "DATABASE_URL": f"sqlite+aiosqlite:///{primary}",
+        "DATABASE_REPLICA_URLS": json.dumps([f"sqlite+aiosqlite:///{replica}"]),
+        # A separate Redis database keeps this instance's cache apart from the server under test.
+        "REDIS_DB": str(settings.REDIS_DB + 1),
+        "LOG_LEVEL": "WARNING",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                if requests.get(f"{base_url}/metrics/json", timeout=1).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("Replica test server did not start")
+        requests.delete(f"{base_url}/phonebook/contacts/debug/all")
+        shutil.copy(primary, replica)
+        yield f"{base_url}/phonebook/contacts"
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+def test_read_replica_routing(replica_server):
+    logger.info("Testing replica reads and read-your-writes stickiness")
+    client = requests.Session()
+    res = client.post(replica_server, json=test_contact | {"first_name": "Replica", "phone": "4910000000"})
+    assert res.status_code == 201, f"Failed to create contact: {res.text}"
+    contact_id = res.json()["id"]
+    assert "phonebook_primary_until" in client.cookies
+
+    # The replica copy predates the write, so only the primary can return the new contact.
+    from_replica = requests.get(replica_server, params={"limit": 100})
+    assert from_replica.status_code == 200
+    assert contact_id not in [c["id"] for c in from_replica.json()]
+
+    from_primary = client.get(replica_server, params={"limit": 100})
+    assert from_primary.status_code == 200
+    assert contact_id in [c["id"] for c in from_primary.json()]
+
+class _Session:
+    """Stand-in for an AsyncSession; the cache paths only look at ``info``."""
+
+    def __init__(self, replica: bool = False):
+        self.info = {"replica": replica}
+
+def test_cache_stampede_protection():
+    logger.info("Testing coalesced loads, replica/primary separation, lock release and stale-while-revalidate")
+    import asyncio
+    import fakeredis
+    from app.core.metrics import custom_registry
+    from app.dependencies import redis as redis_dependency
+    from app.services.local_cache import local_cache
+    from app.services.phonebook_controller import PhonebookController
+
+    endpoint = "/test/stampede"
+    calls = []
+
+    def metric(name):
+        return custom_registry.get_sample_value(name, {"endpoint": endpoint}) or 0.0
+
+    async def load(session):
+        calls.append(session)
+        await asyncio.sleep(0.05)
+        page = f"page-{len(calls)}"
+        if await PhonebookController._may_cache(session):
+            await PhonebookController._set_cache(key, page, local_value=page)
+        return page
+
+    async def scenario():
+        nonlocal key
+        cache = redis_dependency._redis_client
+
+        key = "test:stampede:coalesce"
+        waits = metric("cache_coalesced_waits_total")
+        pages = await asyncio.gather(*(PhonebookController._cached_fetch(_Session(), key, endpoint, load) for _ in range(10)))
+        assert len(calls) == 1 and set(pages) == {"page-1"}
+        assert metric("cache_coalesced_waits_total") == waits + 9
+
+        # A request sticking to the primary must not share a replica load that is already running.
+        calls.clear()
+        key = "test:stampede:routing"
+        await cache.set(PhonebookController.CACHE_INVALIDATED_AT_KEY, time.time())
+        await asyncio.gather(
+            PhonebookController._cached_fetch(_Session(replica=True), key, endpoint, load),
+            PhonebookController._cached_fetch(_Session(), key, endpoint, load),
+        )
+        assert sorted(s.info["replica"] for s in calls) == [False, True]
+
+        # A lock holder that gives up without caching releases waiters right away.
+        calls.clear()
+        key = "test:stampede:lock"
+        await cache.set(f"lock:{key}", "other-worker")
+        asyncio.get_running_loop().call_later(0.1, lambda: asyncio.ensure_future(cache.delete(f"lock:{key}")))
+        start = time.monotonic()
+        await PhonebookController._cached_fetch(_Session(), key, endpoint, load)
+        assert time.monotonic() - start < settings.CACHE_LOCK_WAIT / 2
+        assert len(calls) == 1
+
+        calls.clear()
+        key = "test:stampede:stale"
+        await cache.set(key, "old-page", px=1000)
+        local_cache.delete(key)
+        stale = metric("cache_stale_served_total")
+        assert await PhonebookController._cached_fetch(_Session(), key, endpoint, load) == "old-page"
+        assert metric("cache_stale_served_total") == stale + 1
+        await asyncio.gather(*PhonebookController._refreshing.values())
+        assert len(calls) == 1 and calls[0].info["replica"] is False
+        assert await cache.get(key) == "page-1"
+
+    key = None
+    previous = redis_dependency._redis_client
+    redis_dependency._redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    try:
+        asyncio.run(scenario())
+    finally:
+        redis_dependency._redis_client = previous
+
+def test_cache_fill_races_with_delete(monkeypatch):
+    logger.info("Testing that a read started before a delete does not cache the deleted contact")
+    import asyncio
+    import types
+    import fakeredis
+    from app.dependencies import redis as redis_dependency
+    from app.services.local_cache import local_cache
+    from app.services.phonebook_controller import PhonebookController
+    from app.services.phonebook_db import ContactsDBService
+
+    contact_id = 987654321
+    row = types.SimpleNamespace(**test_contact | {"id": contact_id, "phone": "+1 555 493 0001"})
+    number = "+15554930001"
+
+    async def slow(*args):
+        # The delete commits and evicts while this query is still running.
+        await asyncio.sleep(0.05)
+        return row
+
+    async def slow_batch(*args):
+        return [await slow()]
+
+    monkeypatch.setattr(ContactsDBService, "get_contact", staticmethod(slow))
+    monkeypatch.setattr(ContactsDBService, "get_contact_by_phone", staticmethod(slow))
+    monkeypatch.setattr(ContactsDBService, "get_contacts_by_ids", staticmethod(slow_batch))
+
+    reads = [
+        lambda: PhonebookController._load_contact(_Session(), contact_id),
+        lambda: PhonebookController.get_contacts_batch(_Session(), [contact_id]),
+        lambda: PhonebookController.get_contact_by_phone(_Session(), number),
+    ]
+    keys = [PhonebookController._contact_key(contact_id), PhonebookController._phone_key(number)]
+
+    async def scenario():
+        cache = redis_dependency._redis_client
+        for read in reads:
+            task = asyncio.create_task(read())
+            await asyncio.sleep(0.01)
+            await PhonebookController._after_write(removed=[contact_id], stale_numbers=[number])
+            await task
+            for key in keys:
+                assert await cache.get(key) is None, f"{key} was cached after the delete"
+                assert local_cache.get(key) is None, f"{key} was kept in L1 after the delete"
+
+        # Without a concurrent write the same reads are cached as before.
+        for read in reads:
+            await read()
+        for key in keys:
+            assert await cache.get(key) is not None
+
+    local_cache.clear()
+    previous = redis_dependency._redis_client
+    redis_dependency._redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    try:
+        asyncio.run(scenario())
+    finally:
+        redis_dependency._redis_client = previous
+        local_cache.clear()
+
+def test_ingestion_queue_overflow(monkeypatch):
+    logger.info("Testing that a full write-behind queue sheds with 503 instead of failing")
+    import asyncio
+    import fakeredis
+    from fastapi import HTTPException
+    from app.dependencies import redis as redis_dependency
+    from app.schemas.schemas import ContactCreate, IngestStatus
+    from app.services.phonebook_controller import PhonebookController
+
+    store_statuses = PhonebookController._store_ingest_statuses
+
+    async def slow_store_statuses(statuses, only_if_missing=False):
+        # A real Redis round trip yields to other requests; make sure this one does too.
+        await asyncio.sleep(0.001)
+        await store_statuses(statuses, only_if_missing)
+
+    monkeypatch.setattr(PhonebookController, "_store_ingest_statuses", staticmethod(slow_store_statuses))
+
+    async def scenario():
+        PhonebookController._ingest_queue = asyncio.Queue(maxsize=5)
+        contacts = [ContactCreate(**test_contact | {"phone": f"49300000{i:02d}"}) for i in range(20)]
+        results = await asyncio.gather(*(PhonebookController.enqueue_contact(c) for c in contacts), return_exceptions=True)
+        accepted = [r for r in results if isinstance(r, IngestStatus)]
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(accepted) == 5 and len(rejected) == 15, results
+        assert all(r.status_code == 503 and "Retry-After" in r.headers for r in rejected)
+        cache = redis_dependency._redis_client
+        assert len(await cache.keys("ingest:*")) == 5
+
+        # A late "queued" write must not replace the outcome the flusher already recorded.
+        done = IngestStatus(tracking_id=accepted[0].tracking_id, status="created", contact_id=1)
+        await PhonebookController._store_ingest_statuses([done])
+        await PhonebookController._store_ingest_statuses([accepted[0]], only_if_missing=True)
+        assert (await PhonebookController.get_ingest_status(done.tracking_id)).status == "created"
+
+    previous_client, previous_queue = redis_dependency._redis_client, PhonebookController._ingest_queue
+    redis_dependency._redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    try:
+        asyncio.run(scenario())
+    finally:
+        redis_dependency._redis_client = previous_client
+        PhonebookController._ingest_queue = previous_queue